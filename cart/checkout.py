@@ -0,0 +1,138 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from product.cache import bump_catalogue_version, bump_products
+from product.models import Product
+from .models import Cart, Order, OrderItem
+
+
+class OutOfStock(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Not enough stock.'
+    default_code = 'out_of_stock'
+
+
+# ============================
+#        STOCK
+# ============================
+
+def reserve_stock(quantities):
+    """
+    Take `quantities` ({product_id: n}) off Product.amount, all or nothing.
+
+    Each product is one conditional `UPDATE ... SET amount = amount - n
+    WHERE amount >= n`: no SELECT FOR UPDATE round-trip, the row lock is
+    held only until commit, and products are visited in pk order so two
+    checkouts sharing products cannot deadlock. Must run inside a
+    transaction; OutOfStock rolls back what was already taken.
+    """
+    short = []
+    for product_id in sorted(quantities):
+        taken = Product.objects.filter(
+            pk=product_id, status='active', amount__gte=quantities[product_id]
+        ).update(amount=F('amount') - quantities[product_id])
+        if not taken:
+            short.append(str(product_id))
+    if short:
+        raise OutOfStock(f"Not enough stock for: {', '.join(short)}")
+
+    # Stock shows on cached product pages; whole listings only change
+    # when a product sells out and leaves them
+    sold_out = Product.objects.filter(
+        pk__in=list(quantities), amount=0, status='active'
+    ).update(status='sold_out')
+    transaction.on_commit(lambda: bump_products(list(quantities)))
+    if sold_out:
+        transaction.on_commit(bump_catalogue_version)
+
+
+def release_stock(quantities):
+    """Give reserved stock back; products sold out by checkout become active again"""
+    for product_id in sorted(quantities):
+        Product.objects.filter(pk=product_id).update(amount=F('amount') + quantities[product_id])
+
+    restocked = Product.objects.filter(pk__in=list(quantities), status='sold_out').update(status='active')
+    transaction.on_commit(lambda: bump_products(list(quantities)))
+    if restocked:
+        transaction.on_commit(bump_catalogue_version)
+
+
+def order_quantities(orders):
+    quantities = Counter()
+    for product_id, quantity in OrderItem.objects.filter(order__in=orders).values_list('product_id', 'quantity'):
+        quantities[product_id] += quantity
+    return quantities
+
+
+# ============================
+#        ORDERS
+# ============================
+
+@transaction.atomic
+def checkout(user):
+    """Turn the user's cart into a reserved Order and empty the cart"""
+    items = list(
+        Cart.objects.filter(user=user).select_related('product').only(
+            'uid', 'quantity', 'product__uid', 'product__cost'
+        )
+    )
+    if not items:
+        raise serializers.ValidationError('Cart is empty.')
+
+    reserve_stock({item.product_id: item.quantity for item in items})
+
+    order = Order.objects.create(
+        user=user,
+        total_cost=sum(item.product.cost * item.quantity for item in items),
+        reserved_until=timezone.now() + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES),
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product_id=item.product_id, quantity=item.quantity, unit_cost=item.product.cost)
+        for item in items
+    ])
+    Cart.objects.filter(uid__in=[item.uid for item in items]).delete()
+    return order
+
+
+@transaction.atomic
+def close_order(order_uid, user, new_status):
+    """Confirm or cancel a reservation; cancelling hands the stock back"""
+    order = Order.objects.select_for_update().filter(uid=order_uid, user=user).first()
+    if order is None:
+        return None
+    if order.status != 'reserved' or order.reserved_until < timezone.now():
+        raise serializers.ValidationError('Reservation is no longer active.')
+
+    if new_status == 'cancelled':
+        release_stock(order_quantities([order]))
+    order.status = new_status
+    order.save(update_fields=['status', 'updated_at'])
+    return order
+
+
+@transaction.atomic
+def release_expired_reservations(batch_size):
+    """
+    Expire one batch of overdue reservations and return their stock.
+    SKIP LOCKED lets several sweepers (or a confirm in flight) run side by
+    side without waiting on each other. Returns the number expired.
+    """
+    orders = list(
+        Order.objects.select_for_update(skip_locked=True)
+        .filter(status='reserved', reserved_until__lt=timezone.now())
+        .order_by('reserved_until')
+        .values_list('uid', flat=True)[:batch_size]
+    )
+    if not orders:
+        return 0
+
+    release_stock(order_quantities(orders))
+    Order.objects.filter(uid__in=orders).update(status='expired', updated_at=timezone.now())
+    return len(orders)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge duplicate (user, product) cart rows into one, summing quantities. "
+        "Must run before the unique_cart_user_product constraint is applied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Runs before `migrate`: on the first deploy the quantity column does
+        # not exist yet, and every duplicate was a double tap worth 1
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(cursor, Cart._meta.db_table)
+        self.has_quantity = any(column.name == 'quantity' for column in columns)
+
+        duplicates = (
+            Cart.objects.order_by()
+            .values('user_id', 'product_id')
+            .annotate(rows=Count('uid'))
+            .filter(rows__gt=1)
+        )
+        if self.has_quantity:
+            duplicates = duplicates.annotate(total=Sum('quantity'))
+
+        total = 0
+        batch = []
+        for group in duplicates.iterator():
+            batch.append(group)
+            if len(batch) >= batch_size:
+                total += self.merge(batch)
+                self.stdout.write(f"{total} duplicate group(s) merged...")
+                batch = []
+        if batch:
+            total += self.merge(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} duplicate group(s) merged"))
+
+    @transaction.atomic
+    def merge(self, groups):
+        for group in groups:
+            rows = Cart.objects.filter(user_id=group['user_id'], product_id=group['product_id'])
+            keep = rows.order_by('added_at', 'uid').values_list('uid', flat=True).first()
+            rows.exclude(uid=keep).delete()
+            if self.has_quantity:
+                Cart.objects.filter(uid=keep).update(quantity=group['total'])
+        return len(groups)
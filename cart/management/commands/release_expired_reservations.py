@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.checkout import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Expire unconfirmed orders past reserved_until and return their stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep sweeping every N seconds instead of exiting (0 = run once)"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                released = release_expired_reservations(options['batch_size'])
+                if not released:
+                    break
+                total += released
+                self.stdout.write(f"{total} reservation(s) released...")
+            self.stdout.write(self.style.SUCCESS(f"Done: {total} expired reservation(s) released"))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -1,19 +1,140 @@
 import uuid
 
-from django.db import models
+from django.db import connections, models
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce
 
 from core import settings
 from product.models import Product
 
 
+class CartQuerySet(models.QuerySet):
+    def summary(self):
+        """Item count, total quantity and total cost in one aggregate query"""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        return self.aggregate(
+            item_count=models.Count('uid'),
+            total_quantity=Coalesce(Sum('quantity'), 0),
+            total_cost=Coalesce(
+                Sum(F('product__cost') * F('quantity'), output_field=money), 0, output_field=money
+            ),
+        )
+
+
+    def add_items(self, user, quantities):
+        """
+        Race-free add-to-cart: one INSERT ... ON CONFLICT (user, product)
+        DO UPDATE that creates missing rows and increments existing ones.
+
+        `quantities` maps product_id -> quantity to add. Returns a list of
+        (cart_item, created) in arbitrary order.
+        """
+        if not quantities:
+            return []
+
+        model = self.model
+        opts = model._meta
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        fields = opts.concrete_fields
+
+        def col(name):
+            return qn(opts.get_field(name).column)
+
+        # Values come from the fields themselves (defaults, auto_now_add), so
+        # the statement follows the model instead of a fixed column order
+        params = []
+        for product_id, quantity in quantities.items():
+            candidate = model(user=user, product_id=product_id, quantity=quantity)
+            params += [
+                field.get_db_prep_save(field.pre_save(candidate, True), connection)
+                for field in fields
+            ]
+
+        row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+            f"VALUES {', '.join([row] * len(quantities))} "
+            f"ON CONFLICT ({col('user')}, {col('product')}) DO UPDATE "
+            f"SET {col('quantity')} = {table}.{col('quantity')} + EXCLUDED.{col('quantity')} "
+            f"RETURNING {', '.join(qn(field.column) for field in fields)}, (xmax = 0)"
+        )
+
+        field_names = [field.attname for field in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        return [(model.from_db(self.db, field_names, values[:-1]), values[-1]) for values in rows]
+
+
 class Cart(models.Model):
     uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-added_at']
+        constraints = [
+            # One row per product; repeated adds bump quantity (see CartQuerySet.add_items)
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_cart_user_product')
+        ]
+        indexes = [
+            # Keyset pages of one user's cart (cart.pagination.CartPagination)
+            models.Index(fields=['user', 'added_at', 'uid'], name='cart_user_added_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} in {self.user.name}'s cart"
 
 
+
+
+class Order(models.Model):
+    """
+    Checkout of a cart. Stock is taken off Product.amount when the order is
+    placed (`reserved`); unconfirmed reservations are handed back by
+    `manage.py release_expired_reservations` once reserved_until passes.
+    """
+    STATUS_CHOICES = [
+        ('reserved', 'Reserved'),
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
+    ]
+
+    uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
+    status = models.CharField(choices=STATUS_CHOICES, default='reserved', max_length=10)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2)
+    reserved_until = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Sweeper: WHERE status = 'reserved' AND reserved_until < now()
+            models.Index(fields=['status', 'reserved_until'], name='order_status_reserved_idx'),
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.uid} ({self.status})"
+
+
+class OrderItem(models.Model):
+    uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_items')
+    quantity = models.PositiveIntegerField()
+    # Price at checkout time; later cost edits do not touch placed orders
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
@@ -0,0 +1,8 @@
+from core.pagination import KeysetPagination
+
+
+class CartPagination(KeysetPagination):
+    """Cart rows newest first, seeking on the (user, added_at, uid) index"""
+    page_size = 20
+    ordering = '-added_at'
+    tiebreaker = 'uid'
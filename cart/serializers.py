@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Cart
+from .models import Cart, Order, OrderItem
 from product.models import Product
 from product.serializers import ProductSerializer
 
@@ -9,15 +9,131 @@ from product.serializers import ProductSerializer
 class CartSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_uid = serializers.UUIDField(write_only=True)
+    quantity = serializers.IntegerField(min_value=1, default=1)
 
     class Meta:
         model = Cart
-        fields = ['uid', 'product', 'product_uid', 'added_at']
+        fields = ['uid', 'product', 'product_uid', 'quantity', 'added_at']
+
+    def validate_product_uid(self, value):
+        product = Product.objects.filter(uid=value).first()
+        if product is None:
+            raise serializers.ValidationError("Product not found")
+        return product
 
     def create(self, validated_data):
-        product_uid = validated_data.pop('product_uid')
-        product = Product.objects.get(uid=product_uid)
+        product = validated_data['product_uid']
         user = self.context['request'].user
-        return Cart.objects.create(product=product, user=user)
+
+        # Upsert: a double tap bumps quantity instead of duplicating the row
+        [(item, created)] = Cart.objects.add_items(user, {product.pk: validated_data['quantity']})
+        item.product = product
+        self.created = created
+        return item
+
+
+class CartBatchItemSerializer(serializers.Serializer):
+    product_uid = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Sync a cart in one request: upsert `add` items (quantities are added
+    to what is already in the cart) and delete `remove` products
+    """
+    MAX_ITEMS = 100
+
+    add = CartBatchItemSerializer(many=True, required=False, max_length=MAX_ITEMS)
+    remove = serializers.ListField(
+        child=serializers.UUIDField(), required=False, max_length=MAX_ITEMS
+    )
+
+    def validate_add(self, value):
+        # Merge repeated products: ON CONFLICT cannot touch a row twice
+        quantities = {}
+        for item in value:
+            uid = item['product_uid']
+            quantities[uid] = quantities.get(uid, 0) + item['quantity']
+
+        found = set(Product.objects.filter(uid__in=quantities).values_list('uid', flat=True))
+        missing = [str(uid) for uid in quantities if uid not in found]
+        if missing:
+            raise serializers.ValidationError(f"Products not found: {', '.join(missing)}")
+        return quantities
+
+    def validate(self, data):
+        if not data.get('add') and not data.get('remove'):
+            raise serializers.ValidationError("Nothing to add or remove.")
+        return data
+
+    def save(self, **kwargs):
+        user = self.context['request'].user
+        added = Cart.objects.add_items(user, self.validated_data.get('add', {}))
+
+        removed = 0
+        if self.validated_data.get('remove'):
+            removed, _ = Cart.objects.filter(
+                user=user, product__in=self.validated_data['remove']
+            ).delete()
+
+        return {
+            'added': [
+                {'product_uid': item.product_id, 'quantity': item.quantity, 'created': created}
+                for item, created in added
+            ],
+            'removed': removed,
+        }
+
+
+class CartProductCardSerializer(serializers.ModelSerializer):
+    """Just what a cart row renders: no description, one thumbnail"""
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['uid', 'name', 'cost', 'status', 'thumbnail']
+
+    def get_thumbnail(self, obj):
+        if not obj.photo_manifest:
+            return None
+        entry = obj.photo_manifest[0]
+        url = entry.get('thumbnail') or entry['url']
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class CartItemSerializer(serializers.ModelSerializer):
+    product = CartProductCardSerializer(read_only=True)
+    line_total = serializers.SerializerMethodField()
+
+    # Columns the slim projection needs; everything else stays unselected
+    ONLY_FIELDS = [
+        'uid', 'quantity', 'added_at', 'product__uid', 'product__name',
+        'product__cost', 'product__status', 'product__photo_manifest'
+    ]
+
+    class Meta:
+        model = Cart
+        fields = ['uid', 'product', 'quantity', 'line_total', 'added_at']
+
+    def get_line_total(self, obj):
+        return obj.product.cost * obj.quantity
 
 
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    product = CartProductCardSerializer(read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['uid', 'product', 'quantity', 'unit_cost']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['uid', 'status', 'total_cost', 'reserved_until', 'items', 'created_at', 'updated_at']
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from product.models import Category, Product
+from user.models import User
+from .checkout import OutOfStock, checkout, release_expired_reservations
+from .models import Cart, Order
+
+
+class CartTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', name='Buyer', telegram_id=1001)
+        self.seller = User.objects.create_user(
+            email='seller@example.com', name='Seller', telegram_id=1002, role='seller'
+        )
+        self.category = Category.objects.create(name='Phones')
+        self.client.force_authenticate(self.user)
+
+    def make_product(self, name='Phone', cost='10.00', amount=5, status='active'):
+        return Product.objects.create(
+            name=name, cost=Decimal(cost), amount=amount, owner=self.seller,
+            category=self.category, description='', location='Tashkent', status=status,
+        )
+
+
+class CartBatchTests(CartTestMixin, APITestCase):
+    def test_batch_adds_merges_and_removes_in_one_request(self):
+        phone, case, cable = self.make_product('Phone'), self.make_product('Case'), self.make_product('Cable')
+        Cart.objects.create(user=self.user, product=phone, quantity=1)
+        Cart.objects.create(user=self.user, product=cable, quantity=1)
+
+        response = self.client.post(reverse('batch-cart'), {
+            'add': [
+                {'product_uid': str(phone.uid), 'quantity': 2},
+                {'product_uid': str(case.uid)},
+                {'product_uid': str(case.uid), 'quantity': 2},
+            ],
+            'remove': [str(cable.uid)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['removed'], 1)
+        quantities = dict(Cart.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {phone.uid: 3, case.uid: 3})
+        self.assertEqual(response.data['summary']['item_count'], 2)
+        self.assertEqual(response.data['summary']['total_cost'], Decimal('60.00'))
+
+    def test_batch_rejects_unknown_products(self):
+        response = self.client.post(reverse('batch-cart'), {
+            'add': [{'product_uid': '00000000-0000-0000-0000-000000000000'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_batch_requires_something_to_do(self):
+        response = self.client.post(reverse('batch-cart'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def run_concurrently(target, args_list):
+    """Run `target` once per args tuple in threads released together; returns results/exceptions"""
+    barrier = threading.Barrier(len(args_list))
+    results = [None] * len(args_list)
+
+    def run(index, args):
+        try:
+            barrier.wait()
+            results[index] = target(*args)
+        except Exception as e:
+            results[index] = e
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class AddToCartTests(CartTestMixin, APITestCase):
+    def test_repeated_add_increments_quantity(self):
+        product = self.make_product()
+
+        first = self.client.post(reverse('add-to-cart'), {'product_uid': str(product.uid)}, format='json')
+        second = self.client.post(
+            reverse('add-to-cart'), {'product_uid': str(product.uid), 'quantity': 2}, format='json'
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['uid'], first.data['uid'])
+        self.assertEqual(Cart.objects.get(user=self.user, product=product).quantity, 3)
+
+    def test_add_items_is_a_single_upsert(self):
+        phone, case = self.make_product('Phone'), self.make_product('Case')
+
+        with self.assertNumQueries(1):
+            created = Cart.objects.add_items(self.user, {phone.pk: 1, case.pk: 2})
+        self.assertEqual(sorted(flag for _, flag in created), [True, True])
+
+        with self.assertNumQueries(1):
+            updated = Cart.objects.add_items(self.user, {phone.pk: 4})
+        [(item, flag)] = updated
+        self.assertFalse(flag)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 2)
+
+    def test_upsert_fills_defaults_and_keeps_the_first_added_at(self):
+        phone = self.make_product()
+        [(first, _)] = Cart.objects.add_items(self.user, {phone.pk: 1})
+        self.assertIsNotNone(first.uid)
+        self.assertIsNotNone(first.added_at)
+
+        [(again, _)] = Cart.objects.add_items(self.user, {phone.pk: 1})
+        self.assertEqual((again.uid, again.added_at, again.quantity), (first.uid, first.added_at, 2))
+
+    def test_unknown_product_is_rejected(self):
+        response = self.client.post(
+            reverse('add-to-cart'), {'product_uid': '00000000-0000-0000-0000-000000000000'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CartSummaryTests(CartTestMixin, APITestCase):
+    def test_totals_are_aggregated_in_two_queries(self):
+        phone, case = self.make_product('Phone', cost='100.00'), self.make_product('Case', cost='7.50')
+        Cart.objects.add_items(self.user, {phone.pk: 2, case.pk: 3})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('cart-summary'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['item_count'], response.data['total_quantity']), (2, 5))
+        self.assertEqual(response.data['total_cost'], Decimal('222.50'))
+        lines = {item['product']['name']: item for item in response.data['items']}
+        self.assertEqual(Decimal(str(lines['Case']['line_total'])), Decimal('22.50'))
+        self.assertNotIn('description', lines['Phone']['product'])
+
+    def test_badge_without_items_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cart-summary'), {'items': 'false'})
+
+        self.assertEqual(response.data, {'item_count': 0, 'total_quantity': 0, 'total_cost': Decimal('0')})
+
+
+class DedupeCartItemsTests(CartTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Recreate the pre-constraint table: duplicates cannot exist otherwise
+        [constraint] = Cart._meta.constraints
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(Cart, constraint)
+
+    def test_duplicates_merge_into_the_oldest_row(self):
+        phone, case = self.make_product('Phone'), self.make_product('Case')
+        oldest = Cart.objects.create(user=self.user, product=phone, quantity=1)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+        Cart.objects.create(user=self.user, product=phone, quantity=3)
+        single = Cart.objects.create(user=self.user, product=case, quantity=1)
+
+        out = StringIO()
+        call_command('dedupe_cart_items', batch_size=1, stdout=out)
+
+        self.assertIn('Done: 1 duplicate group(s) merged', out.getvalue())
+        self.assertEqual(
+            sorted(Cart.objects.values_list('uid', 'quantity')),
+            sorted([(oldest.uid, 6), (single.uid, 1)])
+        )
+
+
+class ConcurrentAddToCartTests(CartTestMixin, APITransactionTestCase):
+    def test_parallel_adds_merge_into_one_row(self):
+        product = self.make_product()
+        workers = 8
+
+        results = run_concurrently(
+            Cart.objects.add_items, [(self.user, {product.pk: 1})] * workers
+        )
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(flag for [(_, flag)] in results), 1)
+        self.assertEqual(Cart.objects.get(user=self.user, product=product).quantity, workers)
+
+
+@mock.patch('cart.checkout.bump_catalogue_version')
+class CheckoutTests(CartTestMixin, APITestCase):
+    def checkout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('checkout'))
+
+    def test_checkout_reserves_stock_and_empties_the_cart(self, bump):
+        phone, case = self.make_product('Phone', amount=5), self.make_product('Case', cost='2.50', amount=5)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+        Cart.objects.create(user=self.user, product=case, quantity=1)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'reserved')
+        self.assertEqual(Decimal(response.data['total_cost']), Decimal('22.50'))
+        phone.refresh_from_db()
+        self.assertEqual((phone.amount, phone.status), (3, 'active'))
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+        # Still listed either way: cached catalogue pages stay valid
+        bump.assert_not_called()
+
+    def test_cached_product_pages_show_the_new_stock(self, bump):
+        phone = self.make_product(amount=5)
+        detail = f'/product/products/{phone.uid}/'
+        self.assertEqual(self.client.get(detail).data['amount'], 5)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+
+        self.checkout()
+
+        self.assertEqual(self.client.get(detail).data['amount'], 3)
+
+    def test_last_unit_sells_the_product_out(self, bump):
+        phone = self.make_product(amount=2)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+
+        self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+
+        phone.refresh_from_db()
+        self.assertEqual((phone.amount, phone.status), (0, 'sold_out'))
+        bump.assert_called_once()
+
+    def test_short_stock_reserves_nothing(self, bump):
+        phone, case = self.make_product('Phone', amount=5), self.make_product('Case', amount=1)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+        Cart.objects.create(user=self.user, product=case, quantity=3)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        phone.refresh_from_db()
+        self.assertEqual(phone.amount, 5)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Order.objects.exists())
+        bump.assert_not_called()
+
+    def test_empty_cart_is_rejected(self, bump):
+        self.assertEqual(self.checkout().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_hands_the_stock_back(self, bump):
+        phone = self.make_product(amount=1)
+        Cart.objects.create(user=self.user, product=phone, quantity=1)
+        order_uid = self.checkout().data['uid']
+        bump.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cancel-order', kwargs={'uid': order_uid}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'cancelled')
+        phone.refresh_from_db()
+        self.assertEqual((phone.amount, phone.status), (1, 'active'))
+        bump.assert_called_once()
+
+        again = self.client.post(reverse('cancel-order', kwargs={'uid': order_uid}))
+        self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_reservations_are_released(self, bump):
+        phone = self.make_product(amount=5)
+        Cart.objects.create(user=self.user, product=phone, quantity=2)
+        order_uid = self.checkout().data['uid']
+        Order.objects.filter(uid=order_uid).update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired_reservations(batch_size=10), 1)
+        self.assertEqual(release_expired_reservations(batch_size=10), 0)
+
+        phone.refresh_from_db()
+        self.assertEqual(phone.amount, 5)
+        self.assertEqual(Order.objects.get(uid=order_uid).status, 'expired')
+
+
+class ConcurrentCheckoutTests(CartTestMixin, APITransactionTestCase):
+    def test_last_unit_goes_to_exactly_one_buyer(self):
+        phone = self.make_product(amount=1)
+        buyers = [self.user] + [
+            User.objects.create_user(email=f'buyer{i}@example.com', name=f'Buyer {i}', telegram_id=1100 + i)
+            for i in range(3)
+        ]
+        for buyer in buyers:
+            Cart.objects.create(user=buyer, product=phone, quantity=1)
+
+        results = run_concurrently(checkout, [(buyer,) for buyer in buyers])
+
+        self.assertEqual(sum(isinstance(result, Order) for result in results), 1)
+        self.assertEqual(sum(isinstance(result, OutOfStock) for result in results), len(buyers) - 1)
+        phone.refresh_from_db()
+        self.assertEqual((phone.amount, phone.status), (0, 'sold_out'))
@@ -1,11 +1,20 @@
 # urls.py
 
 from django.urls import path
-from .views import AddToCartView, RemoveFromCartView, ListCartView, SearchCartView
+from .views import (
+    AddToCartView, RemoveFromCartView, ListCartView, SearchCartView, CartSummaryView, CartBatchView,
+    CheckoutView, OrderListView, CloseOrderView
+)
 
 urlpatterns = [
     path('cart/add/', AddToCartView.as_view(), name='add-to-cart'),
+    path('cart/batch/', CartBatchView.as_view(), name='batch-cart'),
     path('cart/remove/<uuid:product_uid>/', RemoveFromCartView.as_view(), name='remove-from-cart'),
     path('car_list/', ListCartView.as_view(), name='list-cart'),
+    path('cart/summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('cart/search/', SearchCartView.as_view(), name='search-cart'),
+    path('cart/checkout/', CheckoutView.as_view(), name='checkout'),
+    path('orders/', OrderListView.as_view(), name='list-orders'),
+    path('orders/<uuid:uid>/confirm/', CloseOrderView.as_view(new_status='confirmed'), name='confirm-order'),
+    path('orders/<uuid:uid>/cancel/', CloseOrderView.as_view(new_status='cancelled'), name='cancel-order'),
 ]
\ No newline at end of file
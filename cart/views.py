@@ -4,17 +4,52 @@ from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Q
+from django.shortcuts import get_object_or_404
 
-from .models import Cart
-from .serializers import CartSerializer
+from product.models import Product
+from product.search import clean_name_query, name_contains
+from .checkout import checkout, close_order
+from .models import Cart, Order
+from .pagination import CartPagination
+from .serializers import CartSerializer, CartItemSerializer, CartBatchSerializer, OrderSerializer
 
 
 class AddToCartView(generics.CreateAPIView):
+    """
+    Idempotent add: adding a product already in the cart increments its
+    quantity (200) instead of creating a duplicate row (201)
+    """
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+        )
+
+
+class CartBatchView(generics.GenericAPIView):
+    """
+    POST /cart/cart/batch/
+    Body: {
+        "add": [{"product_uid": "uuid", "quantity": 2}, ...],
+        "remove": ["product-uuid", ...]
+    }
+    One upsert + one delete, answered with the updated cart totals
+    """
+    serializer_class = CartBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        result['summary'] = Cart.objects.filter(user=request.user).summary()
+        return Response(result)
 
 
 class RemoveFromCartView(generics.DestroyAPIView):
@@ -27,27 +62,98 @@ class RemoveFromCartView(generics.DestroyAPIView):
 
     def get_object(self):
         product_uid = self.kwargs.get('product_uid')
-        return self.get_queryset().get(product__uid=product_uid)
+        return get_object_or_404(self.get_queryset(), product__uid=product_uid)
 
 
 class ListCartView(generics.ListAPIView):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return Cart.objects.filter(user=self.request.user).select_related('product')
+
+
+class CartSummaryView(generics.GenericAPIView):
+    """
+    Cart badge / mini-app summary: totals aggregated in the database plus
+    a slim projection of the items. Two queries regardless of cart size.
+    GET /cart/cart/summary/?items=false skips the item list entirely.
+    """
+    serializer_class = CartItemSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        data = queryset.summary()
+
+        if request.query_params.get('items', 'true').lower() not in ('0', 'false', 'no'):
+            items = queryset.select_related('product').only(*CartItemSerializer.ONLY_FIELDS)
+            data['items'] = self.get_serializer(items, many=True).data
+
+        return Response(data)
+
 
 class SearchCartView(generics.ListAPIView):
-    serializer_class = CartSerializer
+    """
+    GET /cart/cart/search/?q=<at least 3 chars>
+    Matching products are found through the trigram index on product names
+    first, then joined to the user's cart rows; keyset paginated.
+    """
+    serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CartPagination
+    filter_backends = []
 
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
+        query = clean_name_query(self.request.query_params.get('q'))
         return Cart.objects.filter(
             user=self.request.user,
-            product__name__icontains=query
-        )
+            product__in=Product.objects.filter(name_contains(query)).values('pk')
+        ).select_related('product').only(*CartItemSerializer.ONLY_FIELDS)
+
+
+# ============================
+#        CHECKOUT
+# ============================
+
+class OrderMixin:
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).prefetch_related('items__product')
+
+
+class CheckoutView(OrderMixin, generics.GenericAPIView):
+    """
+    POST /cart/cart/checkout/
+    Reserves stock for every cart item in one transaction and empties the
+    cart. 409 if any product is short; nothing is reserved in that case.
+    """
+
+    def post(self, request, *args, **kwargs):
+        order = checkout(request.user)
+        order = self.get_queryset().get(pk=order.pk)
+        return Response(self.get_serializer(order).data, status=status.HTTP_201_CREATED)
+
+
+class OrderListView(OrderMixin, generics.ListAPIView):
+    """GET /cart/orders/"""
 
 
+class CloseOrderView(OrderMixin, generics.GenericAPIView):
+    """
+    POST /cart/orders/<uid>/confirm/ or /cart/orders/<uid>/cancel/
+    Cancelling hands the reserved stock back immediately.
+    """
+    new_status = None
 
+    def post(self, request, *args, **kwargs):
+        order = close_order(kwargs['uid'], request.user, self.new_status)
+        if order is None:
+            return Response({'detail': 'Order not found.'}, status=status.HTTP_404_NOT_FOUND)
+        order = self.get_queryset().get(pk=order.pk)
+        return Response(self.get_serializer(order).data)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from comment.models import Comment
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized Product.comment_count and rating rollups "
+        "(rating_sum / rating_count / rating_avg) from Comment. Meant to run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def rollup(self, comments, aggregate, output_field=None):
+        output_field = output_field or IntegerField()
+        return Coalesce(
+            Subquery(comments.annotate(value=Cast(aggregate, output_field)).values('value')),
+            Value(0),
+            output_field=output_field,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        comments = Comment.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        rated = comments.filter(rating__isnull=False)
+        pks = Product.objects.order_by('pk').values_list('pk', flat=True)
+
+        total = 0
+        last_pk = None
+        while True:
+            batch = pks.filter(pk__gt=last_pk) if last_pk else pks
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            total += Product.objects.filter(pk__in=batch).update(
+                comment_count=self.rollup(comments, Count('pk')),
+                rating_sum=self.rollup(rated, Sum('rating')),
+                rating_count=self.rollup(rated, Count('pk')),
+                rating_avg=self.rollup(rated, Avg('rating'), DecimalField(max_digits=3, decimal_places=2)),
+            )
+            last_pk = batch[-1]
+            self.stdout.write(f"{total} product(s) rebuilt")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} product(s) rebuilt"))
@@ -1,10 +1,19 @@
 import uuid
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from product.models import Product
 from user.models import User
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Just the columns CommentSerializer renders, owner joined in"""
+        return self.select_related('owner').only(
+            'uid', 'body', 'rating', 'created_at', 'updated_at', 'owner__uid', 'owner__name'
+        )
+
+
 class Comment(models.Model):
 
 
@@ -12,15 +21,33 @@ class Comment(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='comments')
     body = models.TextField()
+    # Optional 1-5 stars, rolled up into Product.rating_* by comment.signals
+    rating = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages per product / per author (comment.pagination)
+            models.Index(fields=['product', 'created_at', 'uid'], name='comment_product_created_idx'),
+            models.Index(fields=['owner', 'created_at', 'uid'], name='comment_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.owner} - {self.body[:30]}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Rating as stored, so signals can roll up the difference on update
+        instance._stored_rating = instance.__dict__.get('rating')
+        return instance
+
 
 
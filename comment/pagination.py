@@ -0,0 +1,9 @@
+from core.pagination import KeysetPagination
+
+
+class CommentPagination(KeysetPagination):
+    """Newest comments first, seeking on the (product|owner, created_at, uid) indexes"""
+    page_size = 10
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreaker = 'uid'
@@ -8,17 +8,17 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ['uid', 'owner_id', 'owner_name', 'body', 'created_at', 'updated_at']
+        fields = ['uid', 'owner_id', 'owner_name', 'body', 'rating', 'created_at', 'updated_at']
         read_only_fields = ['uid', 'created_at', 'updated_at']
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = ['product', 'body']
+        fields = ['product', 'body', 'rating']
 
 
 class CommentUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = ['body']
\ No newline at end of file
+        fields = ['body', 'rating']
\ No newline at end of file
@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models import DecimalField, F, IntegerField, Value
+from django.db.models.functions import Cast, Greatest
+from django.db.models.signals import post_delete, post_save
+
+from product.cache import bump_products
+from product.models import Product
+from .models import Comment
+
+
+def update_product_rollups(product_id, comments=0, rating_sum=0, ratings=0):
+    """
+    Apply deltas to the comment/rating rollups of one product in a single
+    UPDATE, inside the transaction that wrote the comment. The average is
+    derived from the pre-update row, so concurrent writers stay consistent.
+    Cached pages rendering this product are dropped on commit (bump_products).
+    """
+    def at_least(value, floor):
+        return Greatest(value, Value(floor), output_field=IntegerField())
+
+    new_sum = at_least(F('rating_sum') + rating_sum, 0)
+    new_count = F('rating_count') + ratings
+    Product.objects.filter(pk=product_id).update(
+        comment_count=at_least(F('comment_count') + comments, 0),
+        rating_sum=new_sum,
+        rating_count=at_least(new_count, 0),
+        rating_avg=Cast(
+            Cast(new_sum, DecimalField(max_digits=12, decimal_places=2)) / at_least(new_count, 1),
+            DecimalField(max_digits=3, decimal_places=2),
+        ),
+    )
+    transaction.on_commit(lambda: bump_products([product_id]))
+
+
+def comment_saved(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_stored_rating', None)
+    new = instance.rating
+    instance._stored_rating = new
+
+    if not created and old == new:
+        return
+    update_product_rollups(
+        instance.product_id,
+        comments=1 if created else 0,
+        rating_sum=(new or 0) - (old or 0),
+        ratings=(new is not None) - (old is not None),
+    )
+
+
+def comment_deleted(sender, instance, **kwargs):
+    rating = getattr(instance, '_stored_rating', instance.rating)
+    update_product_rollups(
+        instance.product_id,
+        comments=-1,
+        rating_sum=-(rating or 0),
+        ratings=-(rating is not None),
+    )
+
+
+post_save.connect(comment_saved, sender=Comment)
+post_delete.connect(comment_deleted, sender=Comment)
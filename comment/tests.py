@@ -1,3 +1,162 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from product.models import Category, Product
+from user.models import User
+from .models import Comment
+
+
+PRODUCTS_URL = '/product/products/'
+
+
+class CommentTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            email='seller@example.com', name='Seller', telegram_id=4001, role='seller'
+        )
+        self.client_user = User.objects.create_user(
+            email='client@example.com', name='Client', telegram_id=4002
+        )
+        self.category = Category.objects.create(name='Phones')
+        self.phone = self.make_product('Phone')
+        self.case = self.make_product('Case')
+
+    def make_product(self, name):
+        return Product.objects.create(
+            name=name, cost=Decimal('10.00'), owner=self.seller, category=self.category,
+            description='', location='Tashkent', status='active'
+        )
+
+    def comment(self, product, rating=None, body='Yaxshi'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Comment.objects.create(owner=self.client_user, product=product, body=body, rating=rating)
+
+    def rollups(self, product):
+        product.refresh_from_db()
+        return product.comment_count, product.rating_sum, product.rating_count, product.rating_avg
+
+
+class RatingRollupTests(CommentTestMixin, APITestCase):
+    def test_create_edit_and_delete_keep_rollups_in_step(self):
+        five = self.comment(self.phone, rating=5)
+        self.comment(self.phone, rating=2)
+        self.comment(self.phone)
+        self.assertEqual(self.rollups(self.phone), (3, 7, 2, Decimal('3.50')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            five.rating = 3
+            five.save()
+        self.assertEqual(self.rollups(self.phone), (3, 5, 2, Decimal('2.50')))
+
+        # Saving an unchanged rating issues no rollup UPDATE
+        with self.assertNumQueries(1):
+            five.body = 'Edited'
+            five.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            five.delete()
+        self.assertEqual(self.rollups(self.phone), (2, 2, 1, Decimal('2.00')))
+        self.assertEqual(self.rollups(self.case), (0, 0, 0, Decimal('0.00')))
+
+    def test_rating_cleared_through_the_api(self):
+        comment = self.comment(self.phone, rating=4)
+        self.client.force_authenticate(self.client_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/comment/{comment.uid}/update/', {'rating': None}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.rollups(self.phone), (1, 0, 0, Decimal('0.00')))
+
+    def test_rebuild_repairs_drifted_rollups(self):
+        self.comment(self.phone, rating=5)
+        self.comment(self.phone, rating=4)
+        Product.objects.filter(pk=self.phone.pk).update(
+            comment_count=9, rating_sum=1, rating_count=1, rating_avg=Decimal('1.00')
+        )
+        Product.objects.filter(pk=self.case.pk).update(comment_count=3)
+
+        out = StringIO()
+        call_command('rebuild_comment_counters', batch_size=1, stdout=out)
+
+        self.assertEqual(self.rollups(self.phone), (2, 9, 2, Decimal('4.50')))
+        self.assertEqual(self.rollups(self.case), (0, 0, 0, Decimal('0.00')))
+        self.assertIn('Done: 2 product(s) rebuilt', out.getvalue())
+
+    def test_list_filters_on_min_rating(self):
+        self.comment(self.phone, rating=5)
+        self.comment(self.case, rating=2)
+
+        response = self.client.get(PRODUCTS_URL, {'min_rating': '4'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in response.data['results']['products']], ['Phone'])
+
+
+class RatingCacheTests(CommentTestMixin, APITestCase):
+    """A comment drops the cached pages of its own product and nothing else"""
+
+    def setUp(self):
+        import fakeredis
+
+        redis_cache = self.settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379/0',
+                'KEY_PREFIX': 'marketplace-tests',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+            }
+        })
+        redis_cache.enable()
+        self.addCleanup(redis_cache.disable)
+        self.addCleanup(cache.clear)
+        super().setUp()
+
+    def test_comment_refreshes_only_the_commented_product(self):
+        self.client.get(f'{PRODUCTS_URL}{self.phone.uid}/')
+        self.client.get(f'{PRODUCTS_URL}{self.case.uid}/')
+
+        self.comment(self.phone, rating=4)
+
+        response = self.client.get(f'{PRODUCTS_URL}{self.phone.uid}/')
+        self.assertEqual((response.data['comment_count'], response.data['rating_avg']), (1, '4.00'))
+        with self.assertNumQueries(0):
+            self.client.get(f'{PRODUCTS_URL}{self.case.uid}/')
+
+
+class CommentListTests(CommentTestMixin, APITestCase):
+    def test_product_comments_page_is_one_joined_query(self):
+        owners = [self.client_user] + [
+            User.objects.create_user(email=f'user{i}@example.com', name=f'User {i}', telegram_id=4100 + i)
+            for i in range(2)
+        ]
+        for i in range(12):
+            Comment.objects.create(owner=owners[i % 3], product=self.phone, body=f'Comment {i}')
+
+        url = f'/comment/product/{self.phone.uid}/'
+        with self.assertNumQueries(1):
+            first = self.client.get(url)
+        self.assertEqual(len(first.data['results']), 10)
+        self.assertEqual(first.data['results'][0]['body'], 'Comment 11')
+        self.assertEqual(first.data['results'][0]['owner_name'], 'User 1')
+
+        rest = self.client.get(first.data['next']).data
+        self.assertEqual([c['body'] for c in rest['results']], ['Comment 1', 'Comment 0'])
+        self.assertIsNone(rest['next'])
+
+    def test_comment_count_follows_create_and_delete(self):
+        self.client.force_authenticate(self.client_user)
+        response = self.client.post('/comment/create/', {'product': str(self.phone.uid), 'body': "Zo'r"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.rollups(self.phone)[0], 1)
+
+        comment = Comment.objects.get()
+        response = self.client.delete(f'/comment/{comment.uid}/delete/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.rollups(self.phone)[0], 0)
@@ -1,17 +1,11 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
 from .models import Comment
+from .pagination import CommentPagination
 from .serializers import CommentSerializer, CommentCreateSerializer, CommentUpdateSerializer
 from product.models import Product
 
 
-class CommentPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 class CommentCreateView(generics.CreateAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentCreateSerializer
@@ -47,7 +41,7 @@ class MyCommentsListView(generics.ListAPIView):
     pagination_class = CommentPagination
 
     def get_queryset(self):
-        return Comment.objects.filter(owner=self.request.user)
+        return Comment.objects.filter(owner=self.request.user).for_listing()
 
 
 class ProductCommentsListView(generics.ListAPIView):
@@ -57,4 +51,4 @@ class ProductCommentsListView(generics.ListAPIView):
 
     def get_queryset(self):
         product_uid = self.kwargs.get('uid')
-        return Comment.objects.filter(product__uid=product_uid)
\ No newline at end of file
+        return Comment.objects.filter(product_id=product_uid).for_listing()
\ No newline at end of file
@@ -0,0 +1,198 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on (ordering field, tiebreaker).
+
+    Unlike LimitOffsetPagination it never issues OFFSET, so every page costs
+    the same index range scan no matter how deep the client scrolls.
+    Cursors are opaque, url-safe base64 blobs bound to the ordering they
+    were issued for. The exact total count is only computed on request.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+
+    # Default ordering and the unique column used to break ties
+    ordering = '-created_at'
+    tiebreaker = 'uid'
+
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        field, descending = self.get_ordering(request, queryset, view)
+        self.ordering_key = f"{'-' if descending else ''}{field}"
+        self.field = field
+        self.descending = descending
+        self.model = queryset.model
+
+        self.total_count = None
+        if self.get_with_count(request):
+            self.total_count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+
+        if cursor is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(cursor['v'], cursor['t'], reverse)
+            )
+
+        # Walking backwards means flipping the sort, then flipping the page
+        page_descending = descending != reverse
+        prefix = '-' if page_descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}{self.tiebreaker}')
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ============================
+    #        ORDERING
+    # ============================
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Reuse the OrderingFilter of the view so `?ordering=` keeps working,
+        but only the first term is used for seeking.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        if not ordering:
+            ordering = [getattr(view, 'keyset_ordering', None) or self.ordering]
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        term = ordering[0]
+        return term.lstrip('-'), term.startswith('-')
+
+    def get_seek_filter(self, value, tiebreaker, reverse):
+        """
+        Row-value comparison `(field, uid) < (value, tiebreaker)` spelled out
+        as OR/AND so every backend can use the composite index.
+        """
+        forward_lt = self.descending != reverse
+        op = 'lt' if forward_lt else 'gt'
+        return (
+            Q(**{f'{self.field}__{op}': value})
+            | Q(**{self.field: value, f'{self.tiebreaker}__{op}': tiebreaker})
+        )
+
+    # ============================
+    #        CURSORS
+    # ============================
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.field)
+        tiebreaker = getattr(instance, self.tiebreaker)
+        payload = {
+            'o': self.ordering_key,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            't': str(tiebreaker),
+            'r': int(reverse),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload['o'] != self.ordering_key:
+                raise ValueError('Cursor was issued for another ordering')
+
+            opts = self.model._meta
+            payload['v'] = opts.get_field(self.field).to_python(payload['v'])
+            payload['t'] = opts.get_field(self.tiebreaker).to_python(payload['t'])
+            payload['r'] = bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return payload
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.page[-1], reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self.page[0], reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    # ============================
+    #        QUERY PARAMS
+    # ============================
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_with_count(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() in ('1', 'true', 'yes')
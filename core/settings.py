@@ -53,6 +53,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'jazzmin',
     "django.contrib.admin",
     "django.contrib.auth",
@@ -60,6 +61,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'rest_framework',
     'user',
     'product',
@@ -68,7 +70,8 @@ INSTALLED_APPS = [
     'cart',
     'drf_yasg',
     'django_filters',
-    # 'message',
+    'channels',
+    'message',
     "corsheaders",
     'rest_framework_simplejwt',
     'drf_extra_fields',
@@ -134,6 +137,49 @@ DATABASES = {
 # }
 
 
+# Cache
+# Redis in production (REDIS_URL), fakeredis for tests (CACHE_BACKEND=fakeredis),
+# per-process locmem when nothing is configured.
+REDIS_URL = env('REDIS_URL', default='')
+CACHE_BACKEND = env('CACHE_BACKEND', default='redis' if REDIS_URL else 'locmem')
+
+if CACHE_BACKEND in ('redis', 'fakeredis'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL or 'redis://127.0.0.1:6379/0',
+            'KEY_PREFIX': 'marketplace',
+            'OPTIONS': {},
+        }
+    }
+    if CACHE_BACKEND == 'fakeredis':
+        import fakeredis
+        CACHES['default']['OPTIONS']['connection_class'] = fakeredis.FakeConnection
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a cached public catalogue response lives (see product.cache)
+CATALOGUE_CACHE_TIMEOUT = env.int('CATALOGUE_CACHE_TIMEOUT', default=300)
+
+# Authenticated principal per JWT (user.authentication.CachedJWTAuthentication):
+# cached user row lifetime, or trust the role/is_active/is_admin token claims
+AUTH_PRINCIPAL_CACHE_TIMEOUT = env.int('AUTH_PRINCIPAL_CACHE_TIMEOUT', default=60)
+AUTH_TRUST_TOKEN_CLAIMS = env.bool('AUTH_TRUST_TOKEN_CLAIMS', default=False)
+
+# Login history / last_login_at writes (user.audit): buffered per process and
+# flushed in batches, or right after commit when LOGIN_AUDIT_SYNC is set
+LOGIN_AUDIT_FLUSH_INTERVAL = env.float('LOGIN_AUDIT_FLUSH_INTERVAL', default=2.0)
+LOGIN_AUDIT_BATCH_SIZE = env.int('LOGIN_AUDIT_BATCH_SIZE', default=500)
+LOGIN_AUDIT_SYNC = env.bool('LOGIN_AUDIT_SYNC', default=False)
+
+# Share of Telegram logins logged in detail at DEBUG level (user.telegram_auth)
+TELEGRAM_AUTH_DEBUG_SAMPLE_RATE = env.float('TELEGRAM_AUTH_DEBUG_SAMPLE_RATE', default=0.01)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -187,6 +233,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Product photo variants (product.images): background threads per process,
+# or inline after commit when IMAGE_PIPELINE_SYNC is set (tests / debugging)
+IMAGE_PIPELINE_WORKERS = env.int('IMAGE_PIPELINE_WORKERS', default=2)
+IMAGE_PIPELINE_SYNC = env.bool('IMAGE_PIPELINE_SYNC', default=False)
+
+# Chunked photo uploads (product.uploads); partial files stay outside MEDIA_ROOT
+PHOTO_UPLOAD_TEMP_DIR = env('PHOTO_UPLOAD_TEMP_DIR', default=os.path.join(BASE_DIR, 'upload_tmp'))
+PHOTO_UPLOAD_MAX_SIZE = env.int('PHOTO_UPLOAD_MAX_SIZE', default=20 * 1024 * 1024)
+PHOTO_UPLOAD_CHUNK_SIZE = env.int('PHOTO_UPLOAD_CHUNK_SIZE', default=2 * 1024 * 1024)
+
+# Checkout (cart.checkout): stock held by an unconfirmed order goes back to
+# the catalogue after this long, see `manage.py release_expired_reservations`
+ORDER_RESERVATION_MINUTES = env.int('ORDER_RESERVATION_MINUTES', default=15)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -194,7 +254,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
@@ -204,16 +264,28 @@ REST_FRAMEWORK = {
     ],
 }
 
-# ASGI_APPLICATION = 'marketplace.asgi.application'  # Uncomment if using async workers
+# ASGI deployment mode (SERVER_MODE=asgi in entrypoint.sh) serves HTTP and
+# the /ws/chat/ WebSocket transport from core.asgi
+ASGI_APPLICATION = 'core.asgi.application'
 
-# CHANNEL_LAYERS = {
-#     'default': {
-#         'BACKEND': 'channels_redis.core.RedisChannelLayer',
-#         'CONFIG': {
-#             "hosts": [('127.0.0.1', 6379)],
-#         },
-#     },
-# }
+# Redis layer for multi-node production, in-memory layer for tests/dev
+CHANNEL_BACKEND = env('CHANNEL_BACKEND', default='redis' if REDIS_URL else 'memory')
+
+if CHANNEL_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [REDIS_URL or 'redis://127.0.0.1:6379/0'],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 
 from datetime import timedelta
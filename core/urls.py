@@ -55,7 +55,7 @@ urlpatterns = [
     path('product/', include('product.urls')),
     path('filters/', include('filters.urls')),
     path('cart/', include('cart.urls')),
-    # path('message/', include('message.urls')),
+    path('message/', include('message.urls')),
     path('comment/', include('comment.urls')),
     # path('api/services/', include('services.urls')),
 
@@ -11,10 +11,22 @@ while ! nc -z $DB_HOST $DB_PORT; do
 done
 echo "✅ Database is ready!"
 
+# Merge duplicate cart rows so the (user, product) unique constraint applies (idempotent)
+echo "🛒 Deduplicating cart items..."
+python manage.py dedupe_cart_items || true
+
 # Run migrations
 echo "📦 Running migrations..."
 python manage.py migrate --noinput
 
+# Index products created before full-text search existed (idempotent)
+echo "🔎 Building product search vectors..."
+python manage.py rebuild_search_vectors --missing
+
+# Backfill ProductImage rows / photo manifests for legacy products (idempotent)
+echo "🖼  Migrating legacy product photos..."
+python manage.py migrate_product_photos
+
 # Collect static files
 echo "📁 Collecting static files..."
 python manage.py collectstatic --noinput --clear
@@ -23,6 +35,18 @@ python manage.py collectstatic --noinput --clear
 echo "💾 Creating cache table..."
 python manage.py createcachetable || true
 
+# SERVER_MODE=asgi serves HTTP + WebSockets (chat push) via Daphne;
+# the default WSGI mode keeps sync Gunicorn workers and REST polling only
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    echo "🌐 Starting Daphne (ASGI)..."
+    exec daphne \
+        --bind 0.0.0.0 \
+        --port 8000 \
+        --proxy-headers \
+        --access-log - \
+        core.asgi:application
+fi
+
 # Start Gunicorn
 echo "🌐 Starting Gunicorn..."
 exec gunicorn \
@@ -0,0 +1,54 @@
+import django_filters
+from django_filters.rest_framework import DjangoFilterBackend
+
+from product.models import Product
+from product.search import clean_name_query, full_text_search, name_contains
+
+
+PUBLIC_STATUS_CHOICES = [
+    ('active', 'ACTIVE'),
+    ('sold_out', 'SOLD OUT'),
+]
+
+
+class ProductFilterSet(django_filters.FilterSet):
+    """
+    Composable catalogue filter: category + location + price range + text + status.
+    Without `status` only active products are returned.
+    """
+    category = django_filters.UUIDFilter(field_name='category')
+    name = django_filters.CharFilter(method='filter_name', label='Name contains')
+    category_name = django_filters.CharFilter(field_name='category__name', lookup_expr='icontains')
+    location = django_filters.CharFilter(field_name='location', lookup_expr='icontains')
+    min_price = django_filters.NumberFilter(field_name='cost', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='cost', lookup_expr='lte')
+    min_rating = django_filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
+    status = django_filters.ChoiceFilter(choices=PUBLIC_STATUS_CHOICES)
+    q = django_filters.CharFilter(method='filter_text', label='Text search')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'name', 'category_name', 'location', 'min_price', 'max_price', 'min_rating', 'status', 'q']
+
+    @property
+    def qs(self):
+        queryset = super().qs
+        if not self.form.cleaned_data.get('status'):
+            queryset = queryset.filter(status='active')
+        return queryset
+
+    def filter_text(self, queryset, name, value):
+        return full_text_search(queryset, clean_name_query(value, name))
+
+    def filter_name(self, queryset, name, value):
+        return queryset.filter(name_contains(clean_name_query(value, name)))
+
+
+class ProductFilterBackend(DjangoFilterBackend):
+    """Lets legacy views rename their query params before filtering"""
+
+    def get_filterset_kwargs(self, request, queryset, view):
+        kwargs = super().get_filterset_kwargs(request, queryset, view)
+        if hasattr(view, 'get_filter_data'):
+            kwargs['data'] = view.get_filter_data(kwargs['data'])
+        return kwargs
@@ -1,3 +1,100 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from product.models import Category, Product
+from user.models import User
+
+
+FILTER_URL = '/filters/products/'
+
+
+class FilterTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            email='seller@example.com', name='Seller', telegram_id=7001, role='seller'
+        )
+        self.phones = Category.objects.create(name='Phones')
+        self.cases = Category.objects.create(name='Cases')
+
+    def make_product(self, name, cost='10.00', category=None, location='Tashkent', **kwargs):
+        kwargs.setdefault('status', 'active')
+        return Product.objects.create(
+            name=name, cost=Decimal(cost), owner=self.seller, category=category or self.phones,
+            description='', location=location, **kwargs
+        )
+
+    def names(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(product['name'] for product in response.data['results'])
+
+
+class ShortQueryTests(FilterTestMixin, APITestCase):
+    """Name queries below the trigram minimum are rejected on every entry point"""
+
+    def setUp(self):
+        super().setUp()
+        self.make_product('iPhone 15')
+
+    def test_short_name_and_text_filters_are_rejected(self):
+        for param in ('name', 'q'):
+            response = self.client.get(FILTER_URL, {param: ' ip '})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, response.data)
+
+        self.assertEqual(self.names(self.client.get(FILTER_URL, {'name': 'phone'})), ['iPhone 15'])
+
+    def test_short_legacy_search_is_rejected(self):
+        response = self.client.get('/filters/products/search/', {'query': 'ip'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_short_product_list_search_is_rejected(self):
+        response = self.client.get('/product/products/', {'search': 'ip'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search', response.data)
+
+
+class ProductFilterViewTests(FilterTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_product('iPhone 15', cost='900.00')
+        self.make_product('Pixel 8', cost='600.00', location='Namangan')
+        self.make_product('Leather case', cost='20.00', category=self.cases)
+        self.make_product('Old phone', cost='50.00', status='sold_out')
+
+    def test_filters_combine_and_hide_inactive_products(self):
+        self.assertEqual(
+            self.names(self.client.get(FILTER_URL)), ['Leather case', 'Pixel 8', 'iPhone 15']
+        )
+        response = self.client.get(FILTER_URL, {'category': str(self.phones.pk), 'min_price': 500, 'max_price': 800})
+        self.assertEqual(self.names(response), ['Pixel 8'])
+        self.assertEqual(self.names(self.client.get(FILTER_URL, {'status': 'sold_out'})), ['Old phone'])
+
+    def test_responses_are_paginated_product_lists(self):
+        response = self.client.get(FILTER_URL, {'location': 'namangan'})
+
+        self.assertEqual(set(response.data), {'count', 'next', 'previous', 'results'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertIn('photo1', response.data['results'][0])
+
+    def test_legacy_routes_rename_their_params(self):
+        cases = [
+            ('/filters/products/filter/category/', {'category': 'case'}, ['Leather case']),
+            ('/filters/products/filter/location/', {'location': 'Namangan'}, ['Pixel 8']),
+            ('/filters/products/filter/price/', {'min': 100, 'max': 700}, ['Pixel 8']),
+            ('/filters/products/search/', {'query': 'pixel'}, ['Pixel 8']),
+        ]
+        for url, params, expected in cases:
+            with self.subTest(url=url):
+                response = self.client.get(url, params)
+                self.assertEqual(set(response.data), {'count', 'next', 'previous', 'results'})
+                self.assertEqual(self.names(response), expected)
+
+    def test_legacy_routes_require_their_params(self):
+        response = self.client.get('/filters/products/filter/price/', {'min': 100})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'min va max parametrlari kerak'})
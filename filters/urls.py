@@ -2,6 +2,7 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('products/', views.ProductFilterView.as_view()),
     path('products/filter/category/', views.filter_by_category),
     path('products/filter/location/', views.filter_by_location),
     path('products/filter/price/', views.filter_by_price),
@@ -1,28 +1,55 @@
+from django.utils.decorators import method_decorator
 from rest_framework import generics
-from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework import status
-from product.models import Product
-from product.serializers import ProductSerializer
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-
-
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from product.models import Product
 from product.serializers import ProductSerializer
+from .filtersets import ProductFilterBackend, ProductFilterSet
+
+
+# ============================
+#   UNIFIED PRODUCT FILTER
+# ============================
+class ProductFilterView(generics.ListAPIView):
+    """
+    GET /filters/products/?category=&category_name=&location=&min_price=&max_price=&q=&status=
+    All filters are optional and combinable; results are paginated.
+    """
+    serializer_class = ProductSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [ProductFilterBackend]
+    filterset_class = ProductFilterSet
+
+    # Legacy wrappers: {query param: error message} and {old name: new name}
+    required_params = {}
+    param_aliases = {}
+
+    def get_queryset(self):
+        return Product.objects.select_related('owner', 'category').order_by('-created_at')
+
+    def get_filter_data(self, data):
+        if not self.param_aliases:
+            return data
+        data = data.copy()
+        for old, new in self.param_aliases.items():
+            if old in data:
+                data[new] = data.pop(old)[-1]
+        return data
+
+    def list(self, request, *args, **kwargs):
+        for param, message in self.required_params.items():
+            if not request.query_params.get(param):
+                return Response({"error": message}, status=400)
+        return super().list(request, *args, **kwargs)
 
 
 # ============================
 #   FILTER BY CATEGORY
 # ============================
-@swagger_auto_schema(
-    method='get',
+@method_decorator(name='get', decorator=swagger_auto_schema(
     manual_parameters=[
         openapi.Parameter(
             'category',
@@ -31,24 +58,16 @@ from product.serializers import ProductSerializer
             type=openapi.TYPE_STRING
         ),
     ],
-    responses={200: ProductSerializer(many=True)}
-)
-@api_view(['GET'])
-def filter_by_category(request):
-    category = request.GET.get('category')
-    if not category:
-        return Response({"error": "category parametri kerak"}, status=400)
-
-    products = Product.objects.filter(category__name__icontains=category)
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=200)
+))
+class FilterByCategoryView(ProductFilterView):
+    required_params = {'category': "category parametri kerak"}
+    param_aliases = {'category': 'category_name'}
 
 
 # ============================
 #   FILTER BY LOCATION
 # ============================
-@swagger_auto_schema(
-    method='get',
+@method_decorator(name='get', decorator=swagger_auto_schema(
     manual_parameters=[
         openapi.Parameter(
             'location',
@@ -57,24 +76,15 @@ def filter_by_category(request):
             type=openapi.TYPE_STRING
         ),
     ],
-    responses={200: ProductSerializer(many=True)}
-)
-@api_view(['GET'])
-def filter_by_location(request):
-    location = request.GET.get('location')
-    if not location:
-        return Response({"error": "location parametri kerak"}, status=400)
-
-    products = Product.objects.filter(location__icontains=location)
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=200)
+))
+class FilterByLocationView(ProductFilterView):
+    required_params = {'location': "location parametri kerak"}
 
 
 # ============================
 #   FILTER BY PRICE RANGE
 # ============================
-@swagger_auto_schema(
-    method='get',
+@method_decorator(name='get', decorator=swagger_auto_schema(
     manual_parameters=[
         openapi.Parameter(
             'min',
@@ -89,46 +99,31 @@ def filter_by_location(request):
             type=openapi.TYPE_INTEGER
         ),
     ],
-    responses={200: ProductSerializer(many=True)}
-)
-@api_view(['GET'])
-def filter_by_price(request):
-    min_price = request.GET.get('min')
-    max_price = request.GET.get('max')
-
-    if not min_price or not max_price:
-        return Response({"error": "min va max parametrlari kerak"}, status=400)
-
-    products = Product.objects.filter(
-        cost__gte=min_price,
-        cost__lte=max_price
-    )
-
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=200)
+))
+class FilterByPriceView(ProductFilterView):
+    required_params = {'min': "min va max parametrlari kerak", 'max': "min va max parametrlari kerak"}
+    param_aliases = {'min': 'min_price', 'max': 'max_price'}
 
 
 # ============================
 #   SEARCH BY NAME
 # ============================
-@swagger_auto_schema(
-    method='get',
+@method_decorator(name='get', decorator=swagger_auto_schema(
     manual_parameters=[
         openapi.Parameter(
             'query',
             openapi.IN_QUERY,
-            description="Mahsulot nomi bo‘yicha qidiruv",
+            description="Mahsulot nomi, manzili va tavsifi bo‘yicha qidiruv",
             type=openapi.TYPE_STRING
         ),
     ],
-    responses={200: ProductSerializer(many=True)}
-)
-@api_view(['GET'])
-def search_products(request):
-    query = request.GET.get('query')
-    if not query:
-        return Response({"error": "query parametri kerak"}, status=400)
-
-    products = Product.objects.filter(name__icontains=query)
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=200)
\ No newline at end of file
+))
+class SearchProductsView(ProductFilterView):
+    required_params = {'query': "query parametri kerak"}
+    param_aliases = {'query': 'q'}
+
+
+filter_by_category = FilterByCategoryView.as_view()
+filter_by_location = FilterByLocationView.as_view()
+filter_by_price = FilterByPriceView.as_view()
+search_products = SearchProductsView.as_view()
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .middleware import AUTH_SUBPROTOCOL
+from .models import Chat
+from .realtime import user_group
+from .serializers import MessageSerializer, SendMessageSerializer
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws://<host>/ws/chat/ with subprotocols ['bearer', '<access jwt>']
+
+    Client -> server:
+        {"action": "send", "receiver_uid": "...", "content": "...", "ref": "<client id>"}
+        {"action": "read", "chat_uid": "..."}
+    Server -> client:
+        {"event": "message.new", "chat": "...", "message": {...}}
+        {"event": "message.bulk", "messages": [{"chat": "...", "message": {...}}, ...]}
+        {"event": "message.read", "chat": "...", "reader": "...", "read_at": "..."}
+        {"event": "message.sent", "ref": "...", "message": {...}}
+        {"event": "error", "ref": "...", "errors": {...}}
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.user = user
+        self.group_name = user_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        # Browsers drop the socket unless one offered subprotocol is echoed
+        subprotocol = AUTH_SUBPROTOCOL if AUTH_SUBPROTOCOL in self.scope.get('subprotocols', []) else None
+        await self.accept(subprotocol=subprotocol)
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        ref = content.get('ref')
+
+        try:
+            if action == 'send':
+                message = await self.send_message(content)
+                await self.send_json({'event': 'message.sent', 'ref': ref, 'message': message})
+            elif action == 'read':
+                await self.mark_read(self.validate_chat_uid(content.get('chat_uid')))
+            else:
+                await self.send_json({'event': 'error', 'ref': ref, 'errors': {'action': 'Unknown action'}})
+        except ValidationError as e:
+            await self.send_json({'event': 'error', 'ref': ref, 'errors': e.detail})
+
+    def validate_chat_uid(self, value):
+        try:
+            return serializers.UUIDField().run_validation(value)
+        except ValidationError as e:
+            raise ValidationError({'chat_uid': e.detail})
+
+    async def chat_event(self, event):
+        await self.send_json(event['payload'])
+
+    @database_sync_to_async
+    def send_message(self, content):
+        serializer = SendMessageSerializer(
+            data={'receiver_uid': content.get('receiver_uid'), 'content': content.get('content')},
+            context={'request': SimpleNamespace(user=self.user)}
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            message = serializer.save()
+        return MessageSerializer(message).data
+
+    @database_sync_to_async
+    def mark_read(self, chat_uid):
+        chat = Chat.objects.for_user(self.user).filter(uid=chat_uid).first()
+        if chat is None:
+            raise ValidationError({'chat_uid': 'Chat not found'})
+        with transaction.atomic():
+            chat.mark_read(self.user)
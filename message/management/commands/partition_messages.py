@@ -0,0 +1,108 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from message.models import Chat, Message
+from user.models import User
+
+
+def month_start(value, offset=0):
+    month = value.month - 1 + offset
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Optional monthly RANGE partitioning of the message table on created_at. "
+        "--convert rewrites the existing table once (needs a maintenance window); "
+        "without it, only the upcoming monthly partitions are created. Schedule "
+        "the latter monthly, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help="Turn the plain message table into a partitioned one")
+        parser.add_argument('--ahead', type=int, default=3,
+                            help="How many future months to pre-create")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Partitioning requires PostgreSQL")
+
+        self.table = Message._meta.db_table
+        partitioned = self.is_partitioned()
+
+        if options['convert']:
+            if partitioned:
+                raise CommandError(f"{self.table} is already partitioned")
+            with transaction.atomic():
+                self.convert(options['ahead'])
+            self.stdout.write(self.style.SUCCESS(f"{self.table} converted to monthly partitions"))
+            return
+
+        if not partitioned:
+            raise CommandError(f"{self.table} is not partitioned; run with --convert first")
+        with transaction.atomic(), connection.cursor() as cursor:
+            today = timezone.now().date()
+            for offset in range(options['ahead'] + 1):
+                self.create_partition(cursor, month_start(today, offset))
+        self.stdout.write(self.style.SUCCESS("Partitions up to date"))
+
+    def is_partitioned(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [self.table],
+            )
+            return cursor.fetchone() is not None
+
+    def create_partition(self, cursor, start):
+        end = month_start(start, 1)
+        name = f"{self.table}_{start:%Y_%m}"
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.table}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    def convert(self, ahead):
+        table = self.table
+        legacy = f"{table}_legacy"
+        column = lambda name: Message._meta.get_field(name).column  # noqa: E731
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN("created_at") FROM "{table}"')
+            first = cursor.fetchone()[0] or timezone.now()
+
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+            cursor.execute(
+                f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE ("created_at")'
+            )
+            # The partition key has to be part of every unique constraint
+            cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ("uid", "created_at")')
+
+            for name, target in (('chat', Chat), ('sender', User), ('receiver', User)):
+                cursor.execute(
+                    f'ALTER TABLE "{table}" ADD FOREIGN KEY ("{column(name)}") '
+                    f'REFERENCES "{target._meta.db_table}" ("{target._meta.pk.column}") '
+                    f'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED'
+                )
+            start = month_start(first)
+            last = month_start(timezone.now().date(), ahead)
+            while start <= last:
+                self.create_partition(cursor, start)
+                start = month_start(start, 1)
+            cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+            cursor.execute(f'DROP TABLE "{legacy}"')
+
+            # Recreated after the drop so they keep the names Django expects
+            cursor.execute(
+                f'CREATE INDEX "message_chat_created_idx" ON "{table}" '
+                f'("{column("chat")}", "created_at", "uid")'
+            )
+            for name in ('sender', 'receiver'):
+                cursor.execute(f'CREATE INDEX ON "{table}" ("{column(name)}")')
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DateTimeField, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from message.models import Chat, Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Chat.last_message and per-participant unread counters from "
+        "Message, counting messages newer than each participant's read watermark"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--seed-watermarks', action='store_true',
+            help="Initialise empty userN_last_read_at from the legacy Message.is_read flags"
+        )
+
+    def unread_for(self, participant):
+        watermark = Coalesce(
+            OuterRef(f'{participant}_last_read_at'),
+            Value(datetime.min.replace(tzinfo=dt_timezone.utc)),
+            output_field=DateTimeField(),
+        )
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(
+                    chat=OuterRef('pk'), receiver=OuterRef(participant), created_at__gt=watermark
+                ).order_by().values('chat').annotate(total=Count('pk')).values('total')
+            ),
+            Value(0),
+        )
+
+    def legacy_watermark_for(self, participant):
+        return Coalesce(
+            F(f'{participant}_last_read_at'),
+            Subquery(
+                Message.objects.filter(
+                    chat=OuterRef('pk'), receiver=OuterRef(participant), is_read=True
+                ).order_by().values('chat').annotate(last=Max('created_at')).values('last')
+            ),
+            output_field=DateTimeField(),
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last = Message.objects.filter(chat=OuterRef('pk')).order_by('-created_at')
+        pks = Chat.objects.order_by('pk').values_list('pk', flat=True)
+
+        total = 0
+        last_pk = None
+        while True:
+            batch = pks.filter(pk__gt=last_pk) if last_pk else pks
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            chats = Chat.objects.filter(pk__in=batch)
+            if options['seed_watermarks']:
+                chats.update(
+                    user1_last_read_at=self.legacy_watermark_for('user1'),
+                    user2_last_read_at=self.legacy_watermark_for('user2'),
+                )
+            total += chats.update(
+                last_message=Subquery(last.values('pk')[:1]),
+                user1_unread_count=self.unread_for('user1'),
+                user2_unread_count=self.unread_for('user2'),
+            )
+            last_pk = batch[-1]
+            self.stdout.write(f"{total} chat(s) rebuilt")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} chat(s) rebuilt"))
@@ -0,0 +1,50 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from user.authentication import CachedJWTAuthentication
+
+
+# `new WebSocket(url, ['bearer', accessToken])`: the token travels in the
+# Sec-WebSocket-Protocol header, never in the URL (which access logs keep)
+AUTH_SUBPROTOCOL = 'bearer'
+
+
+def get_raw_token(scope):
+    """
+    Browsers cannot set headers on a WebSocket handshake, so the access token
+    comes as the second offered subprotocol after `bearer`;
+    `Authorization: Bearer <jwt>` also works for non-browser clients
+    """
+    subprotocols = scope.get('subprotocols') or []
+    if len(subprotocols) >= 2 and subprotocols[0] == AUTH_SUBPROTOCOL:
+        return subprotocols[1]
+
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2:
+                return parts[1]
+    return None
+
+
+@database_sync_to_async
+def get_user(raw_token):
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Populate scope['user'] from a rest_framework_simplejwt access token"""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw_token = get_raw_token(scope)
+        scope['user'] = await get_user(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
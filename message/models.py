@@ -1,8 +1,24 @@
 import uuid
 from django.db import models
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from user.models import User
+from .realtime import publish_bulk_messages, publish_new_message, publish_read_receipt
+
+
+class ChatQuerySet(models.QuerySet):
+    def for_user(self, user):
+        return self.filter(Q(user1=user) | Q(user2=user))
+
+    def with_inbox_summary(self):
+        """
+        Everything the inbox renders lives on the chat row (denormalized
+        counters + last_message pointer), so a page is a single joined query
+        """
+        return self.select_related('user1', 'user2', 'last_message', 'last_message__sender')
 
 
 class Chat(models.Model):
@@ -12,9 +28,27 @@ class Chat(models.Model):
     uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
     user1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chats_as_user1')
     user2 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chats_as_user2')
+
+    # Denormalized inbox state, maintained by Message.save() and
+    # Chat.mark_read(); `manage.py rebuild_chat_counters` repairs drift.
+    # last_message has no DB-level constraint: a partitioned message table
+    # (see `manage.py partition_messages`) cannot be referenced by uid alone
+    last_message = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        db_constraint=False
+    )
+    user1_unread_count = models.PositiveIntegerField(default=0)
+    user2_unread_count = models.PositiveIntegerField(default=0)
+
+    # Read receipts: everything userN received up to this moment is read
+    user1_last_read_at = models.DateTimeField(null=True, blank=True)
+    user2_last_read_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ChatQuerySet.as_manager()
+
     class Meta:
         # Ensure unique chat between two users regardless of order
         constraints = [
@@ -23,6 +57,10 @@ class Chat(models.Model):
                 name='unique_chat_users'
             )
         ]
+        indexes = [
+            models.Index(fields=['user1', '-updated_at'], name='chat_user1_updated_idx'),
+            models.Index(fields=['user2', '-updated_at'], name='chat_user2_updated_idx'),
+        ]
         ordering = ['-updated_at']
 
     def __str__(self):
@@ -46,6 +84,82 @@ class Chat(models.Model):
         )
         return chat, created
 
+    @classmethod
+    def get_or_create_chats(cls, user, others):
+        """
+        Bulk get_or_create_chat: {other_user_id: chat} for every user in
+        `others`, in one INSERT ... ON CONFLICT DO NOTHING plus one SELECT
+        """
+        pairs = [
+            (user.pk, other.pk) if user.pk < other.pk else (other.pk, user.pk)
+            for other in others
+        ]
+        cls.objects.bulk_create(
+            [cls(user1_id=a, user2_id=b) for a, b in pairs],
+            ignore_conflicts=True
+        )
+        other_ids = [other.pk for other in others]
+        chats = cls.objects.filter(
+            Q(user1=user, user2__in=other_ids) | Q(user2=user, user1__in=other_ids)
+        )
+        return {
+            chat.user2_id if chat.user1_id == user.pk else chat.user1_id: chat
+            for chat in chats
+        }
+
+    def unread_field_for(self, user_id):
+        """Name of the unread counter column belonging to `user_id`"""
+        return 'user1_unread_count' if user_id == self.user1_id else 'user2_unread_count'
+
+    def unread_count_for(self, user):
+        return getattr(self, self.unread_field_for(user.pk))
+
+    def last_read_field_for(self, user_id):
+        """Name of the read watermark column belonging to `user_id`"""
+        return 'user1_last_read_at' if user_id == self.user1_id else 'user2_last_read_at'
+
+    def last_read_at_for(self, user_id):
+        return getattr(self, self.last_read_field_for(user_id))
+
+    def unread_messages(self, user):
+        """Messages `user` received after their read watermark"""
+        messages = self.messages.filter(receiver=user)
+        watermark = self.last_read_at_for(user.pk)
+        if watermark is not None:
+            messages = messages.filter(created_at__gt=watermark)
+        return messages
+
+    def mark_read(self, user):
+        """
+        Move `user`'s read watermark up to the newest message they received
+        and take the messages it covers off their unread counter. A message
+        that lands meanwhile is newer than the watermark and stays unread
+        """
+        last_read_field = self.last_read_field_for(user.pk)
+        unread_field = self.unread_field_for(user.pk)
+        covered = self.unread_messages(user).aggregate(
+            newest=Max('created_at'), count=Count('pk')
+        )
+        read_at = covered['newest']
+        if read_at is None:
+            return False
+
+        # Greatest keeps a concurrent mark_read from moving the watermark back
+        updated = Chat.objects.filter(
+            Q(**{f'{last_read_field}__lt': read_at}) | Q(**{f'{last_read_field}__isnull': True}),
+            pk=self.pk,
+        ).update(**{
+            last_read_field: Greatest(F(last_read_field), Value(read_at)),
+            unread_field: Greatest(F(unread_field) - covered['count'], Value(0)),
+        })
+        if not updated:
+            return False
+
+        setattr(self, last_read_field, read_at)
+        setattr(self, unread_field, max(getattr(self, unread_field) - covered['count'], 0))
+        publish_read_receipt(self, user, read_at)
+        return True
+
     def get_other_user(self, current_user):
         """
         Get the other user in the chat
@@ -67,17 +181,71 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     content = models.TextField()
+    # Legacy per-row flag, no longer written: read state is the chat's
+    # userN_last_read_at watermark (see Message.is_read_in). Only read by
+    # `rebuild_chat_counters --seed-watermarks`.
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset history pages: WHERE chat_id = ? AND (created_at, uid) < (?, ?)
+            models.Index(fields=['chat', 'created_at', 'uid'], name='message_chat_created_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.name} to {self.receiver.name}"
 
+    @classmethod
+    def bulk_send(cls, sender, receivers, content):
+        """
+        Send the same `content` from `sender` to every user in `receivers`.
+
+        Constant number of queries whatever the audience size: chats are
+        get-or-created in bulk, messages inserted with one bulk_create, and
+        the denormalized chat state (see Message.save) is bumped with two
+        counter UPDATEs plus one bulk_update of last_message.
+        """
+        if not receivers:
+            return []
+
+        chats = Chat.get_or_create_chats(sender, receivers)
+        messages = cls.objects.bulk_create([
+            cls(chat=chats[receiver.pk], sender=sender, receiver=receiver, content=content)
+            for receiver in receivers
+        ])
+
+        # bulk_create skips Message.save(), so mirror its chat bookkeeping
+        now = timezone.now()
+        chat_ids = [chat.pk for chat in chats.values()]
+        Chat.objects.filter(pk__in=chat_ids, user1=sender).update(
+            user2_unread_count=F('user2_unread_count') + 1, updated_at=now
+        )
+        Chat.objects.filter(pk__in=chat_ids, user2=sender).update(
+            user1_unread_count=F('user1_unread_count') + 1, updated_at=now
+        )
+        for message in messages:
+            message.chat.last_message = message
+        Chat.objects.bulk_update([m.chat for m in messages], ['last_message'], batch_size=500)
+
+        publish_bulk_messages(sender, messages)
+        return messages
+
+    def is_read_in(self, chat):
+        watermark = chat.last_read_at_for(self.receiver_id)
+        return watermark is not None and self.created_at <= watermark
+
     def save(self, *args, **kwargs):
-        # Update chat's updated_at when a new message is saved
+        created = self._state.adding
         super().save(*args, **kwargs)
-        self.chat.save()  # This will trigger the auto_now on updated_at
\ No newline at end of file
+        if created:
+            # One narrow UPDATE instead of re-saving the whole chat row
+            field = self.chat.unread_field_for(self.receiver_id)
+            Chat.objects.filter(pk=self.chat_id).update(
+                last_message=self,
+                updated_at=timezone.now(),
+                **{field: F(field) + 1}
+            )
+            publish_new_message(self)
\ No newline at end of file
@@ -0,0 +1,14 @@
+from core.pagination import KeysetPagination
+
+
+class MessageHistoryPagination(KeysetPagination):
+    """
+    Chat history in pages of `page_size`, newest first, seeking on the
+    (chat, created_at, uid) index: `next` loads older messages, `previous`
+    loads newer ones. Cost stays O(page size) however far back the client
+    scrolls.
+    """
+    page_size = 30
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreaker = 'uid'
@@ -0,0 +1,81 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    """Channel-layer group every socket of a user joins"""
+    return f"user.{user_id}"
+
+
+async def _group_send_all(layer, events):
+    for user_id, payload in events:
+        try:
+            await layer.group_send(user_group(user_id), {'type': 'chat.event', 'payload': payload})
+        except Exception as e:
+            logger.warning(f"Realtime push to {user_id} failed: {e}")
+
+
+def push_events(events):
+    """
+    Deliver (user_id, payload) pairs with a single async_to_sync hop, so a
+    fan-out to N users does not block the caller N times
+    """
+    layer = get_channel_layer()
+    if layer is None or not events:
+        return
+    async_to_sync(_group_send_all)(layer, events)
+
+
+def push_to_users(user_ids, payload):
+    push_events([(user_id, payload) for user_id in user_ids])
+
+
+def publish_new_message(message):
+    """Push a freshly created message to both participants after commit"""
+    from .serializers import MessageSerializer
+
+    payload = {
+        'event': 'message.new',
+        'chat': str(message.chat_id),
+        'message': MessageSerializer(message).data,
+    }
+    user_ids = [message.sender_id, message.receiver_id]
+    transaction.on_commit(lambda: push_to_users(user_ids, payload))
+
+
+def publish_bulk_messages(sender, messages):
+    """
+    Push a bulk send after commit: every receiver gets its own message.new,
+    the sender one message.bulk carrying all of them
+    """
+    from .serializers import MessageSerializer
+
+    payloads = [
+        {'event': 'message.new', 'chat': str(message.chat_id), 'message': data}
+        for message, data in zip(messages, MessageSerializer(messages, many=True).data)
+    ]
+    receiver_ids = [message.receiver_id for message in messages]
+    batch = {
+        'event': 'message.bulk',
+        'messages': [{'chat': p['chat'], 'message': p['message']} for p in payloads],
+    }
+
+    events = list(zip(receiver_ids, payloads)) + [(sender.pk, batch)]
+    transaction.on_commit(lambda: push_events(events))
+
+
+def publish_read_receipt(chat, reader, read_at):
+    """Tell the other participant that `reader` has read everything up to `read_at`"""
+    other_id = chat.user2_id if reader.pk == chat.user1_id else chat.user1_id
+    payload = {
+        'event': 'message.read',
+        'chat': str(chat.pk),
+        'reader': str(reader.pk),
+        'read_at': read_at.isoformat(),
+    }
+    transaction.on_commit(lambda: push_to_users([other_id], payload))
@@ -21,12 +21,18 @@ class MessageSerializer(serializers.ModelSerializer):
     """
     sender = UserBasicSerializer(read_only=True)
     receiver = UserBasicSerializer(read_only=True)
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
         fields = ['uid', 'sender', 'receiver', 'content', 'is_read', 'created_at', 'updated_at']
         read_only_fields = ['uid', 'sender', 'receiver', 'created_at', 'updated_at']
 
+    def get_is_read(self, obj):
+        # Views listing a single chat pass it in the context; others select_related('chat')
+        chat = self.context.get('chat') or obj.chat
+        return obj.is_read_in(chat)
+
 
 class SendMessageSerializer(serializers.ModelSerializer):
     """
@@ -39,23 +45,21 @@ class SendMessageSerializer(serializers.ModelSerializer):
         fields = ['receiver_uid', 'content']
 
     def validate_receiver_uid(self, value):
-        try:
-            receiver = User.objects.get(uid=value)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Receiver not found")
-
         # Check if trying to send message to self
         request = self.context.get('request')
         if request and request.user.uid == value:
             raise serializers.ValidationError("Cannot send message to yourself")
 
-        return value
+        # Resolved once here, reused by create()
+        receiver = User.objects.filter(uid=value).first()
+        if receiver is None:
+            raise serializers.ValidationError("Receiver not found")
+        return receiver
 
     def create(self, validated_data):
         request = self.context.get('request')
         sender = request.user
-        receiver_uid = validated_data.pop('receiver_uid')
-        receiver = User.objects.get(uid=receiver_uid)
+        receiver = validated_data.pop('receiver_uid')
 
         # Get or create chat between users
         chat, created = Chat.get_or_create_chat(sender, receiver)
@@ -71,6 +75,41 @@ class SendMessageSerializer(serializers.ModelSerializer):
         return message
 
 
+class BulkSendMessageSerializer(serializers.Serializer):
+    """
+    Serializer for sending one message to many users at once
+    """
+    MAX_RECEIVERS = 1000
+
+    receiver_uids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=MAX_RECEIVERS
+    )
+    content = serializers.CharField()
+
+    def create(self, validated_data):
+        """
+        Returns per-recipient results in request order:
+        [{'receiver_uid', 'status': sent|not_found|self, 'message_uid'}]
+        """
+        sender = self.context['request'].user
+        receiver_uids = list(dict.fromkeys(validated_data['receiver_uids']))
+
+        receivers = User.objects.filter(uid__in=receiver_uids).exclude(uid=sender.uid).in_bulk()
+        messages = Message.bulk_send(sender, list(receivers.values()), validated_data['content'])
+        sent = {message.receiver_id: message.uid for message in messages}
+
+        results = []
+        for uid in receiver_uids:
+            if uid == sender.uid:
+                status = 'self'
+            elif uid in sent:
+                status = 'sent'
+            else:
+                status = 'not_found'
+            results.append({'receiver_uid': uid, 'status': status, 'message_uid': sent.get(uid)})
+        return results
+
+
 class ChatSerializer(serializers.ModelSerializer):
     """
     Serializer for Chat model
@@ -91,19 +130,19 @@ class ChatSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_message(self, obj):
-        last_message = obj.messages.first()  # Since messages are ordered by -created_at
+        last_message = obj.last_message  # Denormalized pointer, see Message.save
         if last_message:
             return {
                 'uid': last_message.uid,
                 'content': last_message.content,
                 'sender_name': last_message.sender.name,
                 'created_at': last_message.created_at,
-                'is_read': last_message.is_read
+                'is_read': last_message.is_read_in(obj)
             }
         return None
 
     def get_unread_count(self, obj):
         request = self.context.get('request')
         if request:
-            return obj.messages.filter(receiver=request.user, is_read=False).count()
+            return obj.unread_count_for(request.user)
         return 0
\ No newline at end of file
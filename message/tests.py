@@ -1,3 +1,293 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from user.authentication import PrincipalRefreshToken
+from user.models import User
+from .consumers import ChatConsumer
+from .middleware import AUTH_SUBPROTOCOL, JWTAuthMiddleware
+from .models import Chat, Message
+from . import realtime
+from .realtime import user_group
+
+
+def received(layer, channel):
+    """Everything queued on `channel` so far; a marker message avoids blocking on receive"""
+    marker = {'type': 'test.marker'}
+    async_to_sync(layer.send)(channel, marker)
+    events = []
+    while True:
+        event = async_to_sync(layer.receive)(channel)
+        if event == marker:
+            return [event['payload'] for event in events]
+        events.append(event)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RealtimeTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', name='Alice', telegram_id=3001)
+        self.bob = User.objects.create_user(email='bob@example.com', name='Bob', telegram_id=3002)
+        self.carol = User.objects.create_user(email='carol@example.com', name='Carol', telegram_id=3003)
+
+        # One "socket" per user, joined to that user's group like ChatConsumer.connect
+        self.layer = get_channel_layer()
+        self.sockets = {}
+        for user in (self.alice, self.bob, self.carol):
+            channel = async_to_sync(self.layer.new_channel)()
+            async_to_sync(self.layer.group_add)(user_group(user.pk), channel)
+            self.sockets[user.pk] = channel
+
+    def events_for(self, user):
+        return received(self.layer, self.sockets[user.pk])
+
+    def send(self, sender, receiver, content='Salom'):
+        chat = Chat.get_or_create_chats(sender, [receiver])[receiver.pk]
+        return Message.objects.create(chat=chat, sender=sender, receiver=receiver, content=content)
+
+    def test_new_message_is_pushed_to_both_participants_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            message = self.send(self.alice, self.bob)
+        self.assertEqual(self.events_for(self.bob), [])
+
+        for callback in callbacks:
+            callback()
+
+        for user in (self.alice, self.bob):
+            [event] = self.events_for(user)
+            self.assertEqual(event['event'], 'message.new')
+            self.assertEqual(event['chat'], str(message.chat_id))
+            self.assertEqual(event['message']['uid'], str(message.uid))
+        self.assertEqual(self.events_for(self.carol), [])
+
+    def test_bulk_send_pushes_one_batched_event_to_the_sender(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            messages = Message.bulk_send(self.alice, [self.bob, self.carol], 'Yangi mahsulot')
+
+        for user in (self.bob, self.carol):
+            [event] = self.events_for(user)
+            self.assertEqual(event['event'], 'message.new')
+            self.assertEqual(event['message']['content'], 'Yangi mahsulot')
+
+        [batch] = self.events_for(self.alice)
+        self.assertEqual(batch['event'], 'message.bulk')
+        self.assertEqual(
+            sorted(entry['message']['uid'] for entry in batch['messages']),
+            sorted(str(message.uid) for message in messages)
+        )
+
+    def test_bulk_fan_out_notifies_each_receiver_once_in_one_hop(self):
+        receivers = [self.bob, self.carol] + [
+            User.objects.create_user(email=f'user{i}@example.com', name=f'User {i}', telegram_id=3100 + i)
+            for i in range(3)
+        ]
+        for user in receivers[2:]:
+            channel = async_to_sync(self.layer.new_channel)()
+            async_to_sync(self.layer.group_add)(user_group(user.pk), channel)
+            self.sockets[user.pk] = channel
+
+        with mock.patch.object(realtime, 'async_to_sync', wraps=async_to_sync) as hops:
+            with self.captureOnCommitCallbacks(execute=True):
+                messages = Message.bulk_send(self.alice, receivers, 'Chegirma')
+
+        self.assertEqual(hops.call_count, 1)
+        for user, message in zip(receivers, messages):
+            [event] = self.events_for(user)
+            self.assertEqual(event['message']['uid'], str(message.uid))
+        [batch] = self.events_for(self.alice)
+        self.assertEqual(len(batch['messages']), len(receivers))
+
+    def test_mark_read_sends_a_receipt_to_the_other_participant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            message = self.send(self.alice, self.bob)
+        self.events_for(self.alice)
+        self.events_for(self.bob)
+        chat = Chat.objects.get(pk=message.chat_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(chat.mark_read(self.bob))
+
+        [receipt] = self.events_for(self.alice)
+        self.assertEqual(receipt['event'], 'message.read')
+        self.assertEqual(receipt['reader'], str(self.bob.pk))
+        self.assertEqual(receipt['read_at'], message.created_at.isoformat())
+        self.assertEqual(self.events_for(self.bob), [])
+
+        # Nothing new to read: no UPDATE, no receipt
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(chat.mark_read(self.bob))
+        self.assertEqual(self.events_for(self.alice), [])
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ReadWatermarkTests(APITestCase):
+    """Unread counters and the per-participant read watermark"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', name='Alice', telegram_id=3001)
+        self.bob = User.objects.create_user(email='bob@example.com', name='Bob', telegram_id=3002)
+        self.chat, _ = Chat.get_or_create_chat(self.alice, self.bob)
+
+    def send(self, sender, receiver, content='Salom'):
+        return Message.objects.create(chat=self.chat, sender=sender, receiver=receiver, content=content)
+
+    def state(self):
+        chat = Chat.objects.get(pk=self.chat.pk)
+        return chat.unread_count_for(self.alice), chat.unread_count_for(self.bob), chat.last_message_id
+
+    def test_counters_follow_sends_and_reads(self):
+        self.send(self.alice, self.bob)
+        last = self.send(self.alice, self.bob)
+        reply = self.send(self.bob, self.alice)
+        self.assertEqual(self.state(), (1, 2, reply.pk))
+
+        self.client.force_authenticate(self.bob)
+        response = self.client.get(f'/message/chats/{self.chat.pk}/messages/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.state(), (1, 0, reply.pk))
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).last_read_at_for(self.bob.pk), last.created_at)
+
+        # Landing after the watermark, a new message is unread again
+        newer = self.send(self.alice, self.bob)
+        self.assertEqual(self.state(), (1, 1, newer.pk))
+        self.assertEqual(list(Chat.objects.get(pk=self.chat.pk).unread_messages(self.bob)), [newer])
+
+    def test_stale_instance_does_not_rewind_the_watermark(self):
+        self.send(self.alice, self.bob)
+        stale = Chat.objects.get(pk=self.chat.pk)
+        newest = self.send(self.alice, self.bob)
+        self.assertTrue(Chat.objects.get(pk=self.chat.pk).mark_read(self.bob))
+
+        # `stale` has no watermark in memory; the row already covers everything
+        self.assertFalse(stale.mark_read(self.bob))
+        chat = Chat.objects.get(pk=self.chat.pk)
+        self.assertEqual((chat.last_read_at_for(self.bob.pk), chat.unread_count_for(self.bob)), (newest.created_at, 0))
+
+        later = self.send(self.alice, self.bob)
+        self.assertTrue(stale.mark_read(self.bob))
+        chat = Chat.objects.get(pk=self.chat.pk)
+        self.assertEqual((chat.last_read_at_for(self.bob.pk), chat.unread_count_for(self.bob)), (later.created_at, 0))
+
+    def test_rebuild_repairs_drift_against_the_watermark(self):
+        self.send(self.alice, self.bob)
+        read = self.send(self.alice, self.bob)
+        self.chat.mark_read(self.bob)
+        unread = self.send(self.alice, self.bob)
+        Chat.objects.filter(pk=self.chat.pk).update(
+            user1_unread_count=7, user2_unread_count=7, last_message=None
+        )
+
+        out = StringIO()
+        call_command('rebuild_chat_counters', stdout=out)
+
+        self.assertEqual(self.state(), (0, 1, unread.pk))
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).last_read_at_for(self.bob.pk), read.created_at)
+        self.assertIn('Done: 1 chat(s) rebuilt', out.getvalue())
+
+    def test_seed_watermarks_from_legacy_flags(self):
+        first = self.send(self.alice, self.bob)
+        self.send(self.alice, self.bob)
+        Message.objects.filter(pk=first.pk).update(is_read=True)
+
+        call_command('rebuild_chat_counters', '--seed-watermarks', stdout=StringIO())
+
+        chat = Chat.objects.get(pk=self.chat.pk)
+        self.assertEqual(chat.last_read_at_for(self.bob.pk), first.created_at)
+        self.assertIsNone(chat.last_read_at_for(self.alice.pk))
+        self.assertEqual(chat.unread_count_for(self.bob), 1)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ChatListTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', name='Alice', telegram_id=3001)
+        self.client.force_authenticate(self.alice)
+
+    def add_chats(self, count, start=0):
+        for i in range(start, start + count):
+            other = User.objects.create_user(email=f'user{i}@example.com', name=f'User {i}', telegram_id=3100 + i)
+            chat, _ = Chat.get_or_create_chat(self.alice, other)
+            Message.objects.create(chat=chat, sender=other, receiver=self.alice, content=f'Salom {i}')
+
+    def test_inbox_query_count_does_not_grow_with_chats(self):
+        self.add_chats(2)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(self.client.get('/message/chats/').data['results']), 2)
+
+        self.add_chats(5, start=2)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(self.client.get('/message/chats/').data['results']), 7)
+
+        self.assertEqual(len(many), len(few))
+
+    def test_inbox_renders_the_denormalized_chat_state(self):
+        self.add_chats(1)
+        other = User.objects.get(telegram_id=3100)
+        chat = Chat.objects.get()
+        with self.assertNumQueries(2):
+            # INSERT plus one narrow chat UPDATE, no full chat re-save
+            latest = Message.objects.create(chat=chat, sender=other, receiver=self.alice, content='Qalaysiz?')
+
+        [entry] = self.client.get('/message/chats/').data['results']
+        self.assertEqual(entry['unread_count'], 2)
+        self.assertEqual(entry['other_user']['uid'], str(other.uid))
+        self.assertEqual(
+            (entry['last_message']['uid'], entry['last_message']['sender_name']), (latest.uid, 'User 0')
+        )
+
+        self.client.force_authenticate(other)
+        [entry] = self.client.get('/message/chats/').data['results']
+        self.assertEqual(entry['unread_count'], 0)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ChatConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', name='Alice', telegram_id=3001)
+        self.token = str(PrincipalRefreshToken.for_user(self.alice).access_token)
+
+    def communicator(self, path='/ws/chat/', subprotocols=None):
+        return WebsocketCommunicator(JWTAuthMiddleware(ChatConsumer.as_asgi()), path, subprotocols=subprotocols)
+
+    async def test_token_is_taken_from_the_subprotocol(self):
+        communicator = self.communicator(subprotocols=[AUTH_SUBPROTOCOL, self.token])
+        connected, subprotocol = await communicator.connect()
+
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, AUTH_SUBPROTOCOL)
+        await communicator.disconnect()
+
+    async def test_token_in_the_query_string_is_ignored(self):
+        communicator = self.communicator(path=f'/ws/chat/?token={self.token}')
+        connected, code = await communicator.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_malformed_chat_uid_is_an_error_event(self):
+        communicator = self.communicator(subprotocols=[AUTH_SUBPROTOCOL, self.token])
+        await communicator.connect()
+
+        await communicator.send_json_to({'action': 'read', 'chat_uid': 'not-a-uuid', 'ref': 'r1'})
+        response = await communicator.receive_json_from()
+
+        self.assertEqual(response['event'], 'error')
+        self.assertEqual(response['ref'], 'r1')
+        self.assertIn('chat_uid', response['errors'])
+
+        # The socket survives the bad frame
+        await communicator.send_json_to({'action': 'read', 'chat_uid': str(uuid.uuid4()), 'ref': 'r2'})
+        response = await communicator.receive_json_from()
+        self.assertEqual((response['ref'], response['errors']['chat_uid']), ('r2', 'Chat not found'))
+        await communicator.disconnect()
@@ -7,6 +7,9 @@ urlpatterns = [
     # Send message
     path('send/', SendMessageView.as_view()),
 
+    # Send one message to many receivers
+    path('send/bulk/', BulkSendMessageView.as_view()),
+
     # Get received messages
     path('my-messages/', MyMessagesListView.as_view()),
 
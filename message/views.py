@@ -1,12 +1,14 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Max
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from .models import Chat, Message
+from .pagination import MessageHistoryPagination
 from .serializers import (
     MessageSerializer,
     SendMessageSerializer,
+    BulkSendMessageSerializer,
     ChatSerializer
 )
 
@@ -33,6 +35,30 @@ class SendMessageView(generics.CreateAPIView):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
+class BulkSendMessageView(generics.GenericAPIView):
+    """
+    API to send the same message to many users (e.g. a seller's buyers)
+    POST /api/messages/send/bulk/
+    Body: {
+        "receiver_uids": ["uuid-1", "uuid-2", ...],
+        "content": "message content"
+    }
+    Response lists a status per receiver: sent, not_found or self
+    """
+    serializer_class = BulkSendMessageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        return Response({
+            'sent': sum(1 for result in results if result['status'] == 'sent'),
+            'results': results
+        }, status=status.HTTP_201_CREATED)
+
+
 class MyMessagesListView(generics.ListAPIView):
     """
     API to get messages received by the current user
@@ -42,7 +68,9 @@ class MyMessagesListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Message.objects.filter(receiver=self.request.user)
+        return Message.objects.filter(
+            receiver=self.request.user
+        ).select_related('chat', 'sender', 'receiver')
 
 
 class ChatListView(generics.ListAPIView):
@@ -55,45 +83,40 @@ class ChatListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Chat.objects.filter(
-            Q(user1=user) | Q(user2=user)
-        ).annotate(
-            last_message_time=Max('messages__created_at')
-        ).order_by('-last_message_time')
+        return Chat.objects.for_user(user).with_inbox_summary().order_by('-updated_at')
 
 
 class ChatMessagesView(generics.ListAPIView):
     """
     API to get all messages in a specific chat
     GET /api/messages/chats/{chat_uid}/messages/
+    Cursor paginated: follow `next` for older messages, `previous` for newer.
     """
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessageHistoryPagination
 
-    def get_queryset(self):
-        chat_uid = self.kwargs['chat_uid']
-        chat = get_object_or_404(Chat, uid=chat_uid)
+    def get_chat(self):
+        # Fetched once per request; 404 unless the user is a participant
+        if not hasattr(self, '_chat'):
+            self._chat = get_object_or_404(
+                Chat.objects.for_user(self.request.user), uid=self.kwargs['chat_uid']
+            )
+        return self._chat
 
-        # Verify user is part of this chat
-        user = self.request.user
-        if chat.user1 != user and chat.user2 != user:
-            return Message.objects.none()
+    def get_queryset(self):
+        return self.get_chat().messages.select_related('sender', 'receiver')
 
-        return chat.messages.all()
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['chat'] = self.get_chat()
+        return context
 
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
 
-        # Mark messages as read when user views the chat
-        chat_uid = self.kwargs['chat_uid']
-        chat = get_object_or_404(Chat, uid=chat_uid)
-
-        # Mark unread messages as read for the current user
-        Message.objects.filter(
-            chat=chat,
-            receiver=request.user,
-            is_read=False
-        ).update(is_read=True)
+        # Mark messages as read when user views the chat: one watermark UPDATE
+        self.get_chat().mark_read(request.user)
 
         return response
 
@@ -107,7 +130,9 @@ class SentMessagesView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Message.objects.filter(sender=self.request.user)
+        return Message.objects.filter(
+            sender=self.request.user
+        ).select_related('chat', 'sender', 'receiver')
 
 
 class AllMessagesView(generics.ListAPIView):
@@ -122,4 +147,4 @@ class AllMessagesView(generics.ListAPIView):
         user = self.request.user
         return Message.objects.filter(
             Q(sender=user) | Q(receiver=user)
-        )
\ No newline at end of file
+        ).select_related('chat', 'sender', 'receiver')
\ No newline at end of file
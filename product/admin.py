@@ -1,14 +1,28 @@
 from django.contrib import admin
-from .models import Product, Category
+from django.db import transaction
+
+from .cache import bump_catalogue_version
+from .models import Product, Category, PendingProduct, ProductImage
 
-from django.contrib import admin
-from .models import Product, Category, PendingProduct
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    extra = 0
+    fields = ['image', 'position', 'legacy_slot']
+    readonly_fields = ['legacy_slot']
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'status', 'owner', 'created_at']
+    list_display = ['name', 'status', 'owner', 'rating_avg', 'rating_count', 'created_at']
     list_filter = ['status', 'category']
+    readonly_fields = ['comment_count', 'rating_avg', 'rating_count']
+    inlines = [ProductImageInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # photoN fields and inline images both feed the manifest
+        form.instance.sync_legacy_photos()
 
 @admin.register(PendingProduct)
 class PendingProductAdmin(admin.ModelAdmin):
@@ -35,6 +49,8 @@ class PendingProductAdmin(admin.ModelAdmin):
     @admin.action(description="Mark selected products as Active")
     def make_active(self, request, queryset):
         updated_count = queryset.update(status='active')
+        # queryset.update() bypasses post_save, so invalidate explicitly
+        transaction.on_commit(bump_catalogue_version)
         self.message_user(
             request,
             f"{updated_count} product(s) have been activated."
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate
+
+
+def create_trigram_extension(sender, using, **kwargs):
+    """pg_trgm must exist before the gin_trgm_ops index on Product.name is built"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
 
 
 class ProductConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "product"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        pre_migrate.connect(create_trigram_extension, sender=self)
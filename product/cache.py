@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+
+
+def get_catalogue_version():
+    """
+    Current generation of the public catalogue cache. Seeded from the clock
+    so an evicted counter never falls back onto a generation still in cache.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidate every cached catalogue response at once"""
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        get_catalogue_version()
+    except Exception as e:
+        logger.warning(f"Catalogue cache invalidation failed: {e}")
+
+
+# When a product last changed in a way cached pages render (stock,
+# rollups), as a unix timestamp; see bump_products / CatalogueCacheMixin
+PRODUCT_CHANGED_KEY = 'catalogue:product:{}:changed'
+# Tolerated clock skew between web nodes
+PRODUCT_CHANGE_SKEW = 1.0
+
+
+def bump_products(product_ids):
+    """
+    Invalidate only the cached responses that render one of these products,
+    for changes (stock, rollups) that do not move products between pages
+    """
+    now = time.time()
+    try:
+        cache.set_many({PRODUCT_CHANGED_KEY.format(pk): now for pk in product_ids}, timeout=None)
+    except Exception as e:
+        logger.warning(f"Product cache invalidation failed: {e}")
+
+
+def products_changed_since(product_ids, rendered_at):
+    """True if any of the products was bumped after (or just before) rendered_at"""
+    changed = cache.get_many([PRODUCT_CHANGED_KEY.format(pk) for pk in product_ids])
+    return any(value >= rendered_at - PRODUCT_CHANGE_SKEW for value in changed.values())
+
+
+def catalogue_cache_key(request, scope):
+    """Key on host + path + query params normalized for order and blanks"""
+    params = sorted(
+        (key, sorted(v for v in values if v != ''))
+        for key, values in request.query_params.lists()
+    )
+    query = '&'.join(f"{key}={','.join(values)}" for key, values in params if values)
+    raw = f"{request.get_host()}{request.path}?{query}"
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"catalogue:v{get_catalogue_version()}:{scope}:{digest}"
+
+
+class CatalogueCacheMixin:
+    """
+    Serves GET responses of public catalogue views from the shared cache.
+    Entries are invalidated by bumping the catalogue version (product.signals,
+    PendingProductAdmin.make_active), not by deleting keys one by one.
+
+    Each entry also remembers the products it rendered and when; a hit is
+    dropped if one of them was bumped (bump_products) since. The render
+    time is taken before the queries, so a bump racing the render also
+    discards the entry.
+    """
+    catalogue_cache_timeout = None
+
+    def get(self, request, *args, **kwargs):
+        try:
+            key = catalogue_cache_key(request, self.__class__.__name__)
+            entry = cache.get(key)
+            if entry is not None and not products_changed_since(entry['products'], entry['rendered_at']):
+                return Response(entry['data'])
+        except Exception as e:
+            logger.warning(f"Catalogue cache read failed: {e}")
+            return super().get(request, *args, **kwargs)
+
+        rendered_at = time.time()
+        self._rendered = None
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.catalogue_cache_timeout or settings.CATALOGUE_CACHE_TIMEOUT
+            entry = {
+                'data': response.data,
+                'products': self.get_rendered_product_ids(),
+                'rendered_at': rendered_at,
+            }
+            try:
+                cache.set(key, entry, timeout)
+            except Exception as e:
+                logger.warning(f"Catalogue cache write failed: {e}")
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        if args:
+            self._rendered = args[0]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_rendered_product_ids(self):
+        from .models import Product
+
+        rendered = getattr(self, '_rendered', None)
+        if rendered is None or getattr(rendered, 'model', Product) is not Product:
+            return []
+        if isinstance(rendered, Product):
+            rendered = [rendered]
+        return [str(obj.pk) for obj in rendered if isinstance(obj, Product)]
@@ -0,0 +1,145 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# field: (width, height, format, crop to exact size)
+IMAGE_VARIANTS = {
+    'thumbnail': (320, 320, 'JPEG', True),
+    'medium': (1024, 1024, 'JPEG', False),
+    'webp': (1024, 1024, 'WEBP', False),
+}
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix='image-pipeline',
+        )
+    return _executor
+
+
+def schedule_image_processing(image_ids):
+    """Process the given ProductImage rows once the current transaction commits"""
+    image_ids = list(image_ids)
+    if not image_ids:
+        return
+
+    def submit():
+        if settings.IMAGE_PIPELINE_SYNC:
+            for image_id in image_ids:
+                process_product_image(image_id)
+        else:
+            get_executor().submit(_process_batch, image_ids)
+
+    transaction.on_commit(submit)
+
+
+def _process_batch(image_ids):
+    close_old_connections()
+    try:
+        for image_id in image_ids:
+            try:
+                process_product_image(image_id)
+            except Exception as e:
+                logger.error(f"Image processing failed for {image_id}: {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def render_variant(source, width, height, image_format, crop):
+    if crop:
+        variant = ImageOps.fit(source, (width, height), Image.LANCZOS)
+    else:
+        variant = source.copy()
+        variant.thumbnail((width, height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    # No `exif=` argument: the variants never carry EXIF
+    variant.save(buffer, image_format, quality=82, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def flatten(image):
+    """RGB/L pixels for JPEG output; transparent areas become white, not black"""
+    if has_alpha(image):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'L'):
+        return image.convert('RGB')
+    return image
+
+
+def strip_original_exif(product_image, source, original_format):
+    """
+    Rewrite the uploaded original in place without EXIF (GPS, device info),
+    keeping its mode so PNG/WebP transparency survives
+    """
+    clean = source.copy()
+    clean.info.pop('exif', None)
+    buffer = BytesIO()
+    clean.save(buffer, original_format, quality=95)
+    with product_image.image.storage.open(product_image.image.name, 'wb') as f:
+        f.write(buffer.getvalue())
+
+
+def process_product_image(image_id):
+    from .models import ProductImage
+
+    try:
+        product_image = ProductImage.objects.select_related('product').get(pk=image_id)
+    except ProductImage.DoesNotExist:
+        return
+
+    with product_image.image.open('rb') as f:
+        source = Image.open(f)
+        original_format = source.format
+        source.load()
+
+    has_exif = 'exif' in source.info
+    # Bake the EXIF orientation into the pixels; Pillow only writes EXIF
+    # when it is passed explicitly to save()
+    source = ImageOps.exif_transpose(source)
+
+    # Before any mode conversion, so the original keeps its alpha channel
+    if has_exif and original_format:
+        strip_original_exif(product_image, source, original_format)
+
+    # WebP variants keep transparency; JPEG ones are flattened onto white
+    sources = {'JPEG': flatten(source)}
+    sources['WEBP'] = source.convert('RGBA') if has_alpha(source) else sources['JPEG']
+
+    stem = os.path.splitext(os.path.basename(product_image.image.name))[0]
+    for field, (width, height, image_format, crop) in IMAGE_VARIANTS.items():
+        variant = getattr(product_image, field)
+        # Reprocessing (`process_product_images --all`) replaces, not piles up
+        if variant:
+            variant.delete(save=False)
+        content = render_variant(sources[image_format], width, height, image_format, crop)
+        name = f"{stem}_{field}.{FORMAT_EXTENSIONS[image_format]}"
+        variant.save(name, content, save=False)
+
+    product_image.processed_at = timezone.now()
+    product_image.save(update_fields=[*IMAGE_VARIANTS, 'processed_at'])
+    product_image.product.refresh_photo_manifest()
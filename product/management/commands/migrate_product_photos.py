@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import Q
+from django.core.management.base import BaseCommand
+
+from product.models import LEGACY_PHOTO_FIELDS, Product
+
+
+class Command(BaseCommand):
+    help = "Copy legacy photo1..photo5 into ProductImage rows and build photo manifests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Re-sync every product, not only those without a manifest"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Product.objects.order_by('pk')
+        if not options['all']:
+            # Any filled slot counts: photo1 may be empty while photo2..photo5 are not
+            has_photo = Q()
+            for field in LEGACY_PHOTO_FIELDS:
+                has_photo |= ~Q(**{field: ''}) & Q(**{f'{field}__isnull': False})
+            queryset = queryset.filter(has_photo, photo_manifest=[])
+
+        total = 0
+        last_pk = None
+        while True:
+            batch = queryset.filter(pk__gt=last_pk) if last_pk else queryset
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                for product in batch:
+                    product.sync_legacy_photos()
+            total += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"{total} product(s) migrated")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} product(s) migrated"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from product.images import process_product_image
+from product.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/medium/WebP variants for unprocessed product images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Reprocess every image, not only those without variants"
+        )
+
+    def handle(self, *args, **options):
+        queryset = ProductImage.objects.order_by('created_at')
+        if not options['all']:
+            queryset = queryset.filter(processed_at__isnull=True)
+
+        total = 0
+        for image_id in queryset.values_list('pk', flat=True).iterator():
+            try:
+                process_product_image(image_id)
+                total += 1
+            except Exception as e:
+                self.stderr.write(f"{image_id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} image(s) processed"))
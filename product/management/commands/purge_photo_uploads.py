@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from product.models import PhotoUpload
+
+
+class Command(BaseCommand):
+    help = "Delete chunked photo uploads that were never attached to a product"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        total = 0
+        for upload in PhotoUpload.objects.filter(updated_at__lt=cutoff).iterator():
+            upload.discard()
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} stale upload(s) removed"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from product.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.search_vector in batches (backfill / repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--missing', action='store_true',
+            help="Only index products whose search_vector is still empty"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pks = Product.objects.order_by('pk').values_list('pk', flat=True)
+        if options['missing']:
+            pks = pks.filter(search_vector__isnull=True)
+
+        total = 0
+        last_pk = None
+        while True:
+            batch = pks.filter(pk__gt=last_pk) if last_pk else pks
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            total += update_search_vectors(Product.objects.filter(pk__in=batch))
+            last_pk = batch[-1]
+            self.stdout.write(f"{total} product(s) indexed")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} product(s) indexed"))
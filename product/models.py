@@ -1,11 +1,20 @@
 
+import os
 import uuid
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from user.models import User
 
 
+LEGACY_PHOTO_FIELDS = ('photo1', 'photo2', 'photo3', 'photo4', 'photo5')
+IMAGE_VARIANT_FIELDS = ('thumbnail', 'medium', 'webp')
+
+
 class Category(models.Model):
     uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
     name = models.CharField(max_length=500)
@@ -41,27 +50,162 @@ class Product(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Weighted tsvector (name > location > description), maintained by
+    # product.signals / `manage.py rebuild_search_vectors`
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    # Precomputed [{"url": ..., "slot": N|None}, ...] built from `images`,
+    # so list serialization never touches storage
+    photo_manifest = models.JSONField(default=list, blank=True, editable=False)
+
+    # Maintained by comment.signals; `manage.py rebuild_comment_counters` repairs drift
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the active feed: (created_at, uid) seek
+            models.Index(fields=['status', 'created_at', 'uid'], name='product_status_created_idx'),
+            # Unified catalogue filter (filters.ProductFilterSet)
+            models.Index(fields=['status', 'category', 'created_at'], name='product_status_category_idx'),
+            models.Index(fields=['status', 'cost'], name='product_status_cost_idx'),
+            models.Index(fields=['status', 'rating_avg'], name='product_status_rating_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            # Typo-tolerant name matching (pg_trgm, see ProductConfig.ready)
+            GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Substring matching (product.search.name_contains): icontains
+            # compiles to UPPER(name) LIKE ..., so index that expression
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_upper_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
     def get_photos(self):
-        """Return list of all non-empty photos"""
-        photos = []
-        for i in range(1, 6):
-            photo = getattr(self, f'photo{i}')
-            if photo:
-                photos.append(photo)
-        return photos
+        """Return list of all photos in display order"""
+        return [image.image for image in self.images.all()]
 
     def get_photos_urls(self):
-        """Return list of photo URLs"""
-        urls = []
-        for i in range(1, 6):
-            photo = getattr(self, f'photo{i}')
-            if photo:
-                urls.append(photo.url)
-        return urls
+        """Return list of photo URLs from the precomputed manifest"""
+        return [entry['url'] for entry in self.photo_manifest]
+
+    def build_photo_manifest(self):
+        return [image.manifest_entry() for image in self.images.all()]
+
+    def refresh_photo_manifest(self):
+        self.photo_manifest = self.build_photo_manifest()
+        self.save(update_fields=['photo_manifest'])
+
+    def schedule_image_processing(self):
+        from .images import schedule_image_processing
+
+        pending = self.images.filter(processed_at__isnull=True).values_list('pk', flat=True)
+        schedule_image_processing(pending)
+
+    def sync_legacy_photos(self):
+        """
+        Mirror photo1..photo5 into ProductImage rows (sharing the same files)
+        and rebuild the manifest
+        """
+        images = {
+            image.legacy_slot: image
+            for image in self.images.filter(legacy_slot__isnull=False)
+        }
+        for slot, field in enumerate(LEGACY_PHOTO_FIELDS, start=1):
+            photo = getattr(self, field)
+            image = images.get(slot)
+            if not photo:
+                if image:
+                    image.delete()
+            elif image is None:
+                ProductImage.objects.create(
+                    product=self, image=photo.name, position=slot - 1, legacy_slot=slot
+                )
+            elif image.image.name != photo.name:
+                image.image = photo.name
+                image.reset_variants()
+                image.save(update_fields=['image', *IMAGE_VARIANT_FIELDS, 'processed_at'])
+        self.refresh_photo_manifest()
+        self.schedule_image_processing()
+
+
+class ProductImage(models.Model):
+    uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to='products/')
+    position = models.PositiveSmallIntegerField(default=0)
+    # photoN slot this row mirrors; NULL for images beyond the legacy five
+    legacy_slot = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    # Generated by product.images in the background worker pool
+    thumbnail = models.ImageField(upload_to='products/variants/', blank=True, null=True)
+    medium = models.ImageField(upload_to='products/variants/', blank=True, null=True)
+    webp = models.ImageField(upload_to='products/variants/', blank=True, null=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position', 'created_at']
+        indexes = [
+            models.Index(fields=['product', 'position'], name='product_image_position_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.position}"
+
+    def manifest_entry(self):
+        entry = {'url': self.image.url, 'slot': self.legacy_slot}
+        for field in IMAGE_VARIANT_FIELDS:
+            variant = getattr(self, field)
+            if variant:
+                entry[field] = variant.url
+        return entry
+
+    def reset_variants(self):
+        for field in IMAGE_VARIANT_FIELDS:
+            setattr(self, field, None)
+        self.processed_at = None
+
+
+
+def remove_temp_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PhotoUpload(models.Model):
+    """Resumable chunked upload of a single product photo (product.uploads)"""
+    STATUS_CHOICES = [
+        ('uploading', 'UPLOADING'),
+        ('complete', 'COMPLETE'),
+    ]
+
+    uid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='photo_uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(choices=STATUS_CHOICES, default='uploading', max_length=10)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.PHOTO_UPLOAD_TEMP_DIR, f"{self.uid}.part")
 
+    def discard(self):
+        """Delete the row; the partial file goes once the transaction commits"""
+        temp_path = self.temp_path
+        self.delete()
+        transaction.on_commit(lambda: remove_temp_file(temp_path))
 
 
 class PendingProduct(Product):
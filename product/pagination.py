@@ -0,0 +1,12 @@
+from core.pagination import KeysetPagination
+
+
+class ProductCursorPagination(KeysetPagination):
+    """
+    Keyset pagination for the product feed.
+
+    Seeks on (created_at, uid) by default and on (<field>, uid) for any of
+    the `ordering_fields` of ProductListAPIView (cost, name, updated_at).
+    """
+    ordering = '-created_at'
+    tiebreaker = 'uid'
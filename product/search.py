@@ -0,0 +1,107 @@
+import django_filters
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db.models import F, Q
+from rest_framework import serializers
+from rest_framework import filters
+
+from .models import Product
+
+
+# Postgres ships no Uzbek dictionary and listings mix Uzbek/Russian, so we
+# index unstemmed tokens; trigram matching on `name` covers the typos.
+SEARCH_CONFIG = 'simple'
+
+
+# Below three characters a trigram index cannot narrow anything down
+MIN_NAME_QUERY_LENGTH = 3
+
+
+def product_search_vector():
+    """Weighted document: name (A) > location (B) > description (C)"""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('location', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute `search_vector` for the given products in one UPDATE"""
+    return queryset.update(search_vector=product_search_vector())
+
+
+def name_contains(text, prefix=''):
+    """
+    Substring match on Product.name, `prefix` being the path to the product
+    from the filtered model (e.g. 'product__'). Postgres spells icontains
+    as UPPER(name) LIKE UPPER('%text%'), which the product_name_upper_trgm_idx
+    (GIN, gin_trgm_ops on UPPER(name)) serves instead of a sequential scan.
+    """
+    return Q(**{f'{prefix}name__icontains': text})
+
+
+def clean_name_query(text, param='q'):
+    """
+    Strip `text` and reject queries too short for the trigram index; the
+    error is reported under the query parameter `param`. Every caller of
+    name_contains / full_text_search runs user input through this first.
+    """
+    text = (text or '').strip()
+    if len(text) < MIN_NAME_QUERY_LENGTH:
+        raise serializers.ValidationError({
+            param: f"Enter at least {MIN_NAME_QUERY_LENGTH} characters."
+        })
+    return text
+
+
+def full_text_search(queryset, text):
+    """
+    Filter products by full-text match on `search_vector` (GIN), trigram
+    similarity or substring match on `name` (GIN, gin_trgm_ops), ordered by
+    relevance. Each branch has its own index, so the OR is a BitmapOr.
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset
+
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search_rank=SearchRank(F('search_vector'), query),
+        search_similarity=TrigramSimilarity('name', text),
+    ).filter(
+        Q(search_vector=query) | Q(name__trigram_similar=text) | name_contains(text)
+    ).order_by('-search_rank', '-search_similarity', '-created_at')
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """`?search=` backed by full_text_search instead of ILIKE over search_fields"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return full_text_search(queryset, clean_name_query(' '.join(terms), self.search_param))
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """Keeps relevance order for searches unless `?ordering=` is given"""
+
+    def get_ordering(self, request, queryset, view):
+        searching = ProductSearchFilter().get_search_terms(request)
+        if searching and not request.query_params.get(self.ordering_param):
+            return None
+        return super().get_ordering(request, queryset, view)
+
+
+class ProductListFilterSet(django_filters.FilterSet):
+    """Exact filters of the product feed plus `?min_rating=` on the rating rollup"""
+    min_rating = django_filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'owner', 'location', 'min_rating']
@@ -1,9 +1,14 @@
 # serializers.py
+import os
+
 from rest_framework import serializers
-from django.core.exceptions import ValidationError
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 
 from comment.serializers import CommentSerializer
-from .models import Category, Product
+from django.conf import settings
+
+from .models import Category, Product, PhotoUpload, IMAGE_VARIANT_FIELDS, LEGACY_PHOTO_FIELDS
+from .uploads import ALLOWED_IMAGE_EXTENSIONS, attach_uploads
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,56 +17,182 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['uid', 'name']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class LegacyPhotoField(serializers.Field):
+    """
+    Read-only photoN rendered from Product.photo_manifest (no storage calls).
+    Products without legacy slots fill photo1..photo5 from the first five
+    manifest entries, in order.
+    """
+
+    def __init__(self, slot, **kwargs):
+        self.slot = slot
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, product):
+        manifest = product.photo_manifest
+        if any(entry.get('slot') is not None for entry in manifest):
+            entry = next((entry for entry in manifest if entry.get('slot') == self.slot), None)
+        else:
+            entry = manifest[self.slot - 1] if len(manifest) >= self.slot else None
+        return self.parent.absolute_media_url(entry['url']) if entry else None
+
+
+class MediaUrlMixin:
+    def absolute_media_url(self, url):
+        """Prefix a manifest URL with scheme://host, computed once per response"""
+        request = self.context.get('request')
+        if not request or url.startswith(('http://', 'https://')):
+            return url
+        base = self.context.get('_absolute_base')
+        if base is None:
+            base = self.context['_absolute_base'] = request.build_absolute_uri('/').rstrip('/')
+        return base + url
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=uid,name,cost` support for list endpoints.
+
+    Pass `fields=[...]` to keep only those fields, and ask
+    `model_columns(fields)` which Product columns they read so the view can
+    `.only()` them: unrequested columns are never selected.
+    """
+    # Serializer fields backed by other columns than their own name
+    field_columns = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def model_columns(cls, fields=None):
+        opts = cls.Meta.model._meta
+        columns = {'uid'}
+        for name in fields or cls.Meta.fields:
+            for column in cls.field_columns.get(name, [name]):
+                try:
+                    opts.get_field(column)
+                except FieldDoesNotExist:
+                    continue
+                columns.add(column)
+        return columns
+
+
+class ProductSerializer(MediaUrlMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    photo1 = LegacyPhotoField(slot=1)
+    photo2 = LegacyPhotoField(slot=2)
+    photo3 = LegacyPhotoField(slot=3)
+    photo4 = LegacyPhotoField(slot=4)
+    photo5 = LegacyPhotoField(slot=5)
     photos = serializers.SerializerMethodField(read_only=True)
+    photo_variants = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Product
         fields = [
             'uid', 'name', 'cost', 'amount', 'owner', 'category',
             'description', 'location', 'status', 'created_at', 'updated_at',
-            'photo1', 'photo2', 'photo3', 'photo4', 'photo5', 'photos'
+            'photo1', 'photo2', 'photo3', 'photo4', 'photo5', 'photos',
+            'photo_variants', 'comment_count', 'rating_avg', 'rating_count'
         ]
-        read_only_fields = ['uid', 'owner', 'created_at', 'updated_at']
+        read_only_fields = [
+            'uid', 'owner', 'created_at', 'updated_at', 'comment_count', 'rating_avg', 'rating_count'
+        ]
+
+    # photoN, photos and photo_variants all render from the manifest
+    field_columns = {
+        name: ['photo_manifest']
+        for name in LEGACY_PHOTO_FIELDS + ('photos', 'photo_variants')
+    }
 
     def get_photos(self, obj):
-        request = self.context.get('request')
-        photos = []
+        return [self.absolute_media_url(entry['url']) for entry in obj.photo_manifest]
 
-        for i in range(1, 6):
-            photo = getattr(obj, f'photo{i}')
-            if photo:
-                photos.append(request.build_absolute_uri(photo.url) if request else photo.url)
+    def get_photo_variants(self, obj):
+        """Per photo: original plus thumbnail/medium/webp once processed (else null)"""
+        variants = []
+        for entry in obj.photo_manifest:
+            item = {'original': self.absolute_media_url(entry['url'])}
+            for field in IMAGE_VARIANT_FIELDS:
+                url = entry.get(field)
+                item[field] = self.absolute_media_url(url) if url else None
+            variants.append(item)
+        return variants
 
-        return photos
 
-    def validate(self, data):
-        if self.instance is None:  # create
-            if not data.get('photo1'):
-                raise serializers.ValidationError({
-                    'photo1': 'At least one photo is required.'
-                })
-        return data
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PhotoUpload
+        fields = [
+            'uid', 'filename', 'total_size', 'received_bytes', 'content_type',
+            'status', 'chunk_size', 'created_at'
+        ]
+        read_only_fields = ['uid', 'received_bytes', 'content_type', 'status', 'created_at']
+
+    def get_chunk_size(self, obj):
+        return settings.PHOTO_UPLOAD_CHUNK_SIZE
+
+    def validate_filename(self, value):
+        extension = os.path.splitext(value)[1].lstrip('.').lower()
+        if extension not in ALLOWED_IMAGE_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Only {', '.join(ALLOWED_IMAGE_EXTENSIONS)} files are allowed."
+            )
+        return value
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('total_size must be positive.')
+        if value > settings.PHOTO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Photos larger than {settings.PHOTO_UPLOAD_MAX_SIZE} bytes are not allowed."
+            )
+        return value
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
+    # IDs of completed PhotoUploads, attached after photo1..photo5
+    uploads = serializers.ListField(
+        child=serializers.UUIDField(), write_only=True, required=False, max_length=20
+    )
+
     class Meta:
         model = Product
         fields = [
             'name', 'cost', 'amount', 'category', 'description',
             'location', 'status', 'photo1', 'photo2', 'photo3',
-            'photo4', 'photo5'
+            'photo4', 'photo5', 'uploads'
         ]
 
+    def validate_uploads(self, value):
+        # attach_uploads consumes each upload, so one uid cannot be attached twice
+        duplicates = sorted({str(uid) for uid in value if value.count(uid) > 1})
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate uploads: {', '.join(duplicates)}")
+        uploads = PhotoUpload.objects.filter(
+            uid__in=value, owner=self.context['request'].user, status='complete'
+        ).in_bulk()
+        missing = [str(uid) for uid in value if uid not in uploads]
+        if missing:
+            raise serializers.ValidationError(f"Unknown or unfinished uploads: {', '.join(missing)}")
+        return [uploads[uid] for uid in value]
+
     def validate(self, data):
+        has_new_photos = bool(data.get('photo1') or data.get('uploads'))
+
         # create
-        if not self.instance and not data.get('photo1'):
+        if not self.instance and not has_new_photos:
             raise serializers.ValidationError({
                 'photo1': 'At least one photo is required.'
             })
 
         # update
-        if self.instance and not self.instance.photo1 and not data.get('photo1'):
+        if self.instance and not self.instance.photo_manifest and not has_new_photos:
             raise serializers.ValidationError({
                 'photo1': 'At least one photo is required.'
             })
@@ -75,16 +206,45 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
 
         return data
 
+    def create(self, validated_data):
+        uploads = validated_data.pop('uploads', [])
+        product = super().create(validated_data)
+        attach_uploads(product, uploads)
+        product.sync_legacy_photos()
+        return product
+
+    def update(self, instance, validated_data):
+        uploads = validated_data.pop('uploads', [])
+        product = super().update(instance, validated_data)
+        attach_uploads(product, uploads)
+        if uploads or any(field in validated_data for field in LEGACY_PHOTO_FIELDS):
+            product.sync_legacy_photos()
+        return product
+
     def to_representation(self, instance):
         return ProductSerializer(instance, context=self.context).data
 
 
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(MediaUrlMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Slim product card for feeds (`?view=card`): no description and a single
+    thumbnail instead of five photo URLs
+    """
+    thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = [
-            'uid', 'name', 'cost', 'amount', 'category', 'description',
-            'location', 'status', 'created_at', 'updated_at'
+            'uid', 'name', 'cost', 'category', 'location', 'status', 'thumbnail',
+            'comment_count', 'rating_avg', 'rating_count', 'created_at'
         ]
+
+    field_columns = {'thumbnail': ['photo_manifest']}
+
+    def get_thumbnail(self, obj):
+        if not obj.photo_manifest:
+            return None
+        entry = obj.photo_manifest[0]
+        return self.absolute_media_url(entry.get('thumbnail') or entry['url'])
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import bump_catalogue_version
+from .models import Category, Product, PendingProduct
+from .search import update_search_vectors
+
+
+SEARCH_SOURCE_FIELDS = {'name', 'location', 'description'}
+
+
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    update_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+def invalidate_catalogue_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalogue_version)
+
+
+for model in (Product, PendingProduct):
+    post_save.connect(refresh_search_vector, sender=model, dispatch_uid=f'search_vector_{model.__name__}')
+
+for model in (Product, PendingProduct, Category):
+    post_save.connect(invalidate_catalogue_cache, sender=model, dispatch_uid=f'catalogue_save_{model.__name__}')
+    post_delete.connect(invalidate_catalogue_cache, sender=model, dispatch_uid=f'catalogue_delete_{model.__name__}')
@@ -1,3 +1,449 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from user.models import User
+from .cache import (
+    CATALOGUE_VERSION_KEY, bump_catalogue_version, bump_products, catalogue_cache_key, get_catalogue_version
+)
+from .images import process_product_image
+from .models import Category, PhotoUpload, Product, ProductImage
+
+
+PRODUCTS_URL = '/product/products/'
+
+
+class ProductTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            email='seller@example.com', name='Seller', telegram_id=2001, role='seller'
+        )
+        self.category = Category.objects.create(name='Phones')
+
+    def make_product(self, name='Phone', cost='10.00', **kwargs):
+        kwargs.setdefault('status', 'active')
+        return Product.objects.create(
+            name=name, cost=Decimal(cost), owner=self.seller, category=self.category,
+            description='', location='Tashkent', **kwargs
+        )
+
+
+class CatalogueCacheTests(ProductTestMixin, APITestCase):
+    """Catalogue responses cached in (fake) Redis, invalidated by version bumps"""
+
+    def setUp(self):
+        import fakeredis
+
+        redis_cache = self.settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379/0',
+                'KEY_PREFIX': 'marketplace-tests',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+            }
+        })
+        redis_cache.enable()
+        self.addCleanup(redis_cache.disable)
+        self.addCleanup(cache.clear)
+        super().setUp()
+
+    def test_list_is_served_from_cache(self):
+        product = self.make_product()
+        first = self.client.get(PRODUCTS_URL)
+
+        # A queryset update skips the signals, so the cached page stays
+        Product.objects.filter(pk=product.pk).update(name='Renamed')
+        with self.assertNumQueries(0):
+            second = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.data['results']['products'][0]['name'], 'Phone')
+
+    def test_saving_a_product_invalidates_cached_pages(self):
+        product = self.make_product()
+        self.client.get(PRODUCTS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Renamed'
+            product.save()
+
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response.data['results']['products'][0]['name'], 'Renamed')
+
+    def test_bump_seeds_a_missing_version(self):
+        cache.delete(CATALOGUE_VERSION_KEY)
+        bump_catalogue_version()
+        version = get_catalogue_version()
+
+        self.assertIsNotNone(version)
+        bump_catalogue_version()
+        self.assertEqual(get_catalogue_version(), version + 1)
+
+    def test_product_bump_drops_only_pages_rendering_it(self):
+        phone, case = self.make_product('Phone'), self.make_product('Case')
+        self.client.get(PRODUCTS_URL)
+        self.client.get(f'{PRODUCTS_URL}{phone.uid}/')
+        self.client.get(f'{PRODUCTS_URL}{case.uid}/')
+
+        Product.objects.filter(pk=phone.pk).update(amount=7)
+        bump_products([phone.pk])
+
+        self.assertEqual(self.client.get(f'{PRODUCTS_URL}{phone.uid}/').data['amount'], 7)
+        listed = {p['name']: p['amount'] for p in self.client.get(PRODUCTS_URL).data['results']['products']}
+        self.assertEqual(listed['Phone'], 7)
+        with self.assertNumQueries(0):
+            self.client.get(f'{PRODUCTS_URL}{case.uid}/')
+
+    def test_cache_key_ignores_param_order_and_blanks(self):
+        factory = APIRequestFactory()
+        a = Request(factory.get(PRODUCTS_URL, {'category': 'x', 'location': 'Tashkent', 'owner': ''}))
+        b = Request(factory.get(PRODUCTS_URL, {'location': 'Tashkent', 'category': 'x'}))
+        c = Request(factory.get(PRODUCTS_URL, {'location': 'Samarkand', 'category': 'x'}))
+
+        self.assertEqual(catalogue_cache_key(a, 'list'), catalogue_cache_key(b, 'list'))
+        self.assertNotEqual(catalogue_cache_key(a, 'list'), catalogue_cache_key(c, 'list'))
+
+
+class ProductKeysetPaginationTests(ProductTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # Three products share created_at, so pages must break ties on uid
+        self.products = [
+            self.make_product(f'Product {i}', cost=str(10 + i), created_at=now - timedelta(minutes=min(i, 2)))
+            for i in range(5)
+        ]
+
+    def walk(self, url, link='next'):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = [product['name'] for product in response.data['results']['products']]
+            names = names + page if link == 'next' else page + names
+            url = response.data[link]
+        return names
+
+    def test_pages_cover_every_product_once_in_order(self):
+        expected = [
+            p.name for p in sorted(self.products, key=lambda p: (p.created_at, p.uid), reverse=True)
+        ]
+        self.assertEqual(self.walk(f'{PRODUCTS_URL}?pagination=cursor&page_size=2'), expected)
+
+    def test_previous_links_walk_back_to_the_first_page(self):
+        url = f'{PRODUCTS_URL}?pagination=cursor&page_size=2'
+        forward = self.walk(url)
+
+        last_page = self.client.get(url)
+        while last_page.data['next']:
+            last_page = self.client.get(last_page.data['next'])
+        self.assertEqual(self.walk(last_page.data['previous'], link='previous') + [
+            product['name'] for product in last_page.data['results']['products']
+        ], forward)
+
+    def test_seeks_on_the_requested_ordering(self):
+        names = self.walk(f'{PRODUCTS_URL}?pagination=cursor&page_size=2&ordering=-cost')
+        self.assertEqual(names, [f'Product {i}' for i in reversed(range(5))])
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        first = self.client.get(f'{PRODUCTS_URL}?pagination=cursor&page_size=2')
+        cursor = first.data['next'].split('cursor=')[1].split('&')[0]
+
+        response = self.client.get(f'{PRODUCTS_URL}?cursor={cursor}&ordering=cost')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_count_only_on_request(self):
+        response = self.client.get(f'{PRODUCTS_URL}?pagination=cursor')
+        self.assertNotIn('total_count', response.data['results'])
+
+        response = self.client.get(f'{PRODUCTS_URL}?pagination=cursor&with_count=true')
+        self.assertEqual(response.data['results']['total_count'], 5)
+
+    def test_search_needs_an_explicit_ordering_in_cursor_mode(self):
+        response = self.client.get(f'{PRODUCTS_URL}?pagination=cursor&search=Product')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pagination', response.data)
+
+        names = self.walk(f'{PRODUCTS_URL}?pagination=cursor&page_size=2&search=Product&ordering=cost')
+        self.assertEqual(names, [f'Product {i}' for i in range(5)])
+
+
+def image_bytes(image_format='PNG', size=(8, 8), mode='RGB', color=(200, 30, 30), **options):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+class TempMediaMixin(ProductTestMixin):
+    """MEDIA_ROOT and the upload temp dir in throwaway directories"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root, temp_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        paths = self.settings(MEDIA_ROOT=self.media_root, PHOTO_UPLOAD_TEMP_DIR=temp_dir, IMAGE_PIPELINE_SYNC=True)
+        paths.enable()
+        self.addCleanup(paths.disable)
+
+
+class PhotoUploadTests(TempMediaMixin, APITestCase):
+    """Chunked uploads: create, PUT chunks, sniffing, attach to a product, purge"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.seller)
+
+    def start(self, body, filename='photo.png'):
+        response = self.client.post('/product/uploads/', {'filename': filename, 'total_size': len(body)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return PhotoUpload.objects.get(uid=response.data['uid'])
+
+    def put_chunk(self, upload, body, start):
+        return self.client.generic(
+            'PUT', f'/product/uploads/{upload.uid}/', body, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(body) - 1}/{upload.total_size}',
+        )
+
+    def upload(self, body):
+        upload = self.start(body)
+        middle = len(body) // 2
+        self.assertEqual(self.put_chunk(upload, body[:middle], 0).status_code, status.HTTP_200_OK)
+        response = self.put_chunk(upload, body[middle:], middle)
+        self.assertEqual(response.data['status'], 'complete')
+        upload.refresh_from_db()
+        return upload
+
+    def create_product(self, uploads):
+        return self.client.post('/product/products/create/', {
+            'name': 'Phone', 'cost': '10.00', 'amount': 1, 'category': str(self.category.pk),
+            'description': 'New', 'location': 'Tashkent', 'uploads': [str(uid) for uid in uploads],
+        }, format='json')
+
+    def test_chunks_are_assembled_and_sniffed(self):
+        body = image_bytes()
+        upload = self.upload(body)
+
+        self.assertEqual(upload.content_type, 'image/png')
+        self.assertEqual(upload.received_bytes, len(body))
+        with open(upload.temp_path, 'rb') as f:
+            self.assertEqual(f.read(), body)
+
+    def test_non_image_first_chunk_is_rejected(self):
+        body = b'<html><script>alert(1)</script></html>'
+        upload = self.start(body)
+
+        response = self.put_chunk(upload, body, 0)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received_bytes, 0)
+
+    def test_chunk_at_the_wrong_offset_conflicts(self):
+        body = image_bytes()
+        upload = self.start(body)
+        self.assertEqual(self.put_chunk(upload, body[10:], 10).status_code, status.HTTP_409_CONFLICT)
+
+    def test_non_image_filename_is_rejected(self):
+        response = self.client.post('/product/uploads/', {'filename': 'x.html', 'total_size': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finished_upload_is_attached_under_a_generated_name(self):
+        upload = self.upload(image_bytes())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create_product([upload.uid])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = ProductImage.objects.get(product__name='Phone')
+        # Named after the sniffed type, never after the client's 'photo.png'
+        self.assertRegex(os.path.basename(image.image.name), r'^[0-9a-f]{32}\.png$')
+        self.assertFalse(PhotoUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(os.path.exists(upload.temp_path))
+
+    def test_duplicate_upload_ids_are_rejected(self):
+        upload = self.upload(image_bytes())
+
+        response = self.create_product([upload.uid, upload.uid])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('uploads', response.data)
+        self.assertTrue(PhotoUpload.objects.filter(pk=upload.pk).exists())
+        self.assertTrue(os.path.exists(upload.temp_path))
+
+    def test_purge_removes_only_stale_uploads(self):
+        stale, fresh = self.upload(image_bytes()), self.upload(image_bytes(color=(0, 0, 0)))
+        PhotoUpload.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=25))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('purge_photo_uploads', hours=24, stdout=StringIO())
+
+        self.assertEqual(list(PhotoUpload.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertFalse(os.path.exists(stale.temp_path))
+        self.assertTrue(os.path.exists(fresh.temp_path))
+
+
+class ImagePipelineTests(TempMediaMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.make_product()
+
+    def add_image(self, body, name):
+        image = ProductImage(product=self.product)
+        image.image.save(name, ContentFile(body), save=False)
+        image.save()
+        return image
+
+    def open_field(self, field_file):
+        with field_file.open('rb') as f:
+            image = Image.open(f)
+            image.load()
+        return image
+
+    def exif_with_gps(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'  # Make
+        exif[0x8825] = {2: (41.0, 18.0, 0.0)}  # GPSInfo: latitude
+        return exif.tobytes()
+
+    def test_transparent_png_keeps_alpha_and_loses_exif(self):
+        body = image_bytes('PNG', size=(64, 64), mode='RGBA', color=(0, 0, 0, 0), exif=self.exif_with_gps())
+        image = self.add_image(body, 'clear.png')
+
+        process_product_image(image.pk)
+        image.refresh_from_db()
+
+        original = self.open_field(image.image)
+        self.assertEqual(original.mode, 'RGBA')
+        self.assertNotIn('exif', original.info)
+        self.assertEqual(original.getpixel((0, 0))[3], 0)
+
+        webp = self.open_field(image.webp)
+        self.assertEqual(webp.mode, 'RGBA')
+        self.assertEqual(webp.getpixel((0, 0))[3], 0)
+        # JPEG has no alpha: transparent areas are flattened onto white
+        thumbnail = self.open_field(image.thumbnail).convert('RGB')
+        self.assertTrue(all(channel > 240 for channel in thumbnail.getpixel((0, 0))))
+
+    def test_jpeg_exif_is_stripped_from_the_original(self):
+        body = image_bytes('JPEG', size=(64, 48), exif=self.exif_with_gps())
+        image = self.add_image(body, 'camera.jpg')
+
+        process_product_image(image.pk)
+        image.refresh_from_db()
+
+        self.assertNotIn('exif', self.open_field(image.image).info)
+        self.assertEqual(self.open_field(image.thumbnail).size, (320, 320))
+        self.assertEqual(self.open_field(image.medium).size, (64, 48))
+        self.assertIsNotNone(image.processed_at)
+        self.assertIn(image.thumbnail.url, str(Product.objects.get(pk=self.product.pk).photo_manifest))
+
+    def test_reprocessing_replaces_variant_files(self):
+        image = self.add_image(image_bytes('PNG', size=(64, 64)), 'plain.png')
+        call_command('process_product_images', stdout=StringIO())
+        variants_dir = os.path.join(self.media_root, 'products', 'variants')
+        before = sorted(os.listdir(variants_dir))
+
+        out = StringIO()
+        call_command('process_product_images', '--all', stdout=out)
+
+        self.assertIn('Done: 1 image(s) processed', out.getvalue())
+        self.assertEqual(sorted(os.listdir(variants_dir)), before)
+        image.refresh_from_db()
+        self.assertEqual(os.path.basename(image.webp.name), 'plain_webp.webp')
+
+
+class LegacyPhotoMigrationTests(TempMediaMixin, APITestCase):
+    def test_products_with_any_legacy_slot_are_migrated(self):
+        name = default_storage.save('products/legacy.png', ContentFile(image_bytes('PNG')))
+        third_only, bare = self.make_product('Third only'), self.make_product('Bare')
+        # Written with update() so no signal builds the manifest first
+        Product.objects.filter(pk=third_only.pk).update(photo3=name, photo_manifest=[])
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('migrate_product_photos', stdout=out)
+
+        self.assertIn('Done: 1 product(s) migrated', out.getvalue())
+        third_only.refresh_from_db()
+        self.assertEqual([entry.get('slot') for entry in third_only.photo_manifest], [3])
+        self.assertFalse(bare.images.exists())
+
+
+class SearchVectorTests(ProductTestMixin, APITestCase):
+    def search(self, text):
+        response = self.client.get(PRODUCTS_URL, {'search': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.data['results']['products']]
+
+    def test_saved_products_are_searchable_by_relevance(self):
+        self.make_product('Charger', description='Works with any samsung phone')
+        self.make_product('Samsung Galaxy')
+        self.make_product('Case')
+
+        self.assertEqual(self.search('samsung'), ['Samsung Galaxy', 'Charger'])
+
+    def test_rebuild_backfills_missing_vectors(self):
+        indexed, missing = self.make_product('Samsung Galaxy'), self.make_product('Samsung Tab')
+        Product.objects.filter(pk=missing.pk).update(search_vector=None)
+        self.assertEqual(self.search('tab'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_vectors', '--missing', stdout=out)
+
+        self.assertIn('Done: 1 product(s) indexed', out.getvalue())
+        self.assertEqual(self.search('tab'), ['Samsung Tab'])
+        self.assertEqual(sorted(self.search('samsung')), ['Samsung Galaxy', 'Samsung Tab'])
+
+        call_command('rebuild_search_vectors', batch_size=1, stdout=out)
+        self.assertIn('Done: 2 product(s) indexed', out.getvalue())
+        indexed.refresh_from_db()
+        self.assertIsNotNone(indexed.search_vector)
+
+
+class SparseFieldsetTests(ProductTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_product('Phone', description='A long description nobody asked for')
+
+    def product_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PRODUCTS_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [q['sql'] for q in queries if 'FROM "product_product"' in q['sql'] and 'COUNT(' not in q['sql']]
+        return response.data['results']['products'], selects
+
+    def test_only_requested_fields_are_rendered_and_selected(self):
+        [product], [sql] = self.product_queries({'fields': 'uid,name,cost'})
+
+        self.assertEqual(set(product), {'uid', 'name', 'cost'})
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"photo_manifest"', sql)
+
+    def test_card_view_is_slim(self):
+        [product], [sql] = self.product_queries({'view': 'card'})
+
+        self.assertIn('thumbnail', product)
+        self.assertNotIn('description', product)
+        self.assertNotIn('"description"', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(PRODUCTS_URL, {'fields': 'uid,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', str(response.data['fields']))
@@ -0,0 +1,120 @@
+import os
+import re
+import uuid
+
+import filetype
+from django.conf import settings
+from django.core.files import File
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+
+ALLOWED_IMAGE_MIME_TYPES = ('image/jpeg', 'image/png', 'image/webp')
+
+# Stored files are named uuid + the extension of the sniffed type, never
+# after the client's filename: nginx picks Content-Type by extension
+MIME_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+ALLOWED_IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp')
+
+# filetype needs at most this many leading bytes to identify a file
+SNIFF_BYTES = 261
+READ_BLOCK = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadOffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the current upload offset.'
+    default_code = 'offset_conflict'
+
+
+def parse_content_range(header, content_length):
+    """
+    `Content-Range: bytes <start>-<end>/<total>` -> (start, length, total).
+    Falls back to a single chunk at offset 0 when the header is absent.
+    """
+    if not header:
+        return 0, content_length, None
+    match = CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        raise serializers.ValidationError({'Content-Range': 'Expected "bytes start-end/total".'})
+    start, end, total = (int(value) for value in match.groups())
+    if end < start or end - start + 1 != content_length:
+        raise serializers.ValidationError({'Content-Range': 'Range does not match Content-Length.'})
+    return start, content_length, total
+
+
+def validate_image_head(head):
+    kind = filetype.guess(head)
+    if kind is None or kind.mime not in ALLOWED_IMAGE_MIME_TYPES:
+        raise serializers.ValidationError({'file': 'Only JPEG, PNG and WebP images are allowed.'})
+    return kind.mime
+
+
+def write_chunk(upload, stream, offset, length):
+    """
+    Stream one chunk from the request body to the partial file in fixed-size
+    blocks, so memory stays bounded whatever the chunk size. The first
+    chunk is type-checked before a single byte hits the disk.
+    """
+    if offset != upload.received_bytes:
+        raise UploadOffsetConflict(
+            f"Expected offset {upload.received_bytes}, got {offset}."
+        )
+    if length <= 0:
+        raise serializers.ValidationError({'detail': 'Empty chunk.'})
+    if length > settings.PHOTO_UPLOAD_CHUNK_SIZE:
+        raise serializers.ValidationError(
+            {'detail': f"Chunk exceeds {settings.PHOTO_UPLOAD_CHUNK_SIZE} bytes."}
+        )
+    if offset + length > upload.total_size:
+        raise serializers.ValidationError({'detail': 'Chunk runs past the declared total_size.'})
+
+    head = b''
+    if offset == 0:
+        head = stream.read(min(SNIFF_BYTES, length))
+        upload.content_type = validate_image_head(head)
+
+    os.makedirs(os.path.dirname(upload.temp_path), exist_ok=True)
+    mode = 'r+b' if os.path.exists(upload.temp_path) else 'wb'
+    written = 0
+    with open(upload.temp_path, mode) as f:
+        # Drop leftovers of an earlier chunk that failed half-way
+        f.truncate(offset)
+        f.seek(offset)
+        if head:
+            f.write(head)
+            written += len(head)
+        while written < length:
+            block = stream.read(min(READ_BLOCK, length - written))
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+
+    if written != length:
+        raise serializers.ValidationError({'detail': 'Chunk body shorter than Content-Length.'})
+
+    upload.received_bytes = offset + written
+    if upload.received_bytes == upload.total_size:
+        upload.status = 'complete'
+    upload.save(update_fields=['received_bytes', 'content_type', 'status', 'updated_at'])
+    return upload
+
+
+def attach_uploads(product, uploads):
+    """Move finished uploads into ProductImage rows after the legacy photos"""
+    from .models import ProductImage
+
+    last = product.images.order_by('-position').values_list('position', flat=True).first()
+    position = 5 if last is None else max(last + 1, 5)
+
+    for upload in uploads:
+        image = ProductImage(product=product, position=position)
+        name = f"{uuid.uuid4().hex}.{MIME_EXTENSIONS[upload.content_type]}"
+        with open(upload.temp_path, 'rb') as f:
+            image.image.save(name, File(f), save=False)
+        image.save()
+        upload.discard()
+        position += 1
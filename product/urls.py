@@ -13,6 +13,8 @@ from product.views import (
     ProductUpdateView,
     ProductDeleteView,
     MyProductsListView,
+    PhotoUploadCreateView,
+    PhotoUploadChunkView,
     # PendingProductListView,
 
 )
@@ -35,6 +37,9 @@ urlpatterns = [
 
     path('my-products/', MyProductsListView.as_view()),
 
+    path('uploads/', PhotoUploadCreateView.as_view()),
+    path('uploads/<uuid:uid>/', PhotoUploadChunkView.as_view()),
+
     # path('admin/products/pending/', PendingProductListView.as_view()),
 
 ]
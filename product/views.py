@@ -1,13 +1,19 @@
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework import generics, filters, status
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.views import APIView
+from rest_framework import generics, serializers, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
 
-from .models import Product, Category
+from .cache import CatalogueCacheMixin
+from .models import Product, Category, PhotoUpload
+from .pagination import ProductCursorPagination
+from .search import ProductListFilterSet, ProductOrderingFilter, ProductSearchFilter
+from .uploads import parse_content_range, write_chunk
 from .serializers import *
 from user.permissions import IsSeller, IsAdmin
 
@@ -43,7 +49,7 @@ class CategoryDeleteView(generics.DestroyAPIView):
     # permission_classes = [IsAdmin]
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CatalogueCacheMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -57,7 +63,7 @@ class ProductCreateView(generics.CreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductCreateUpdateSerializer
     permission_classes = [IsAuthenticated, IsSeller]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def perform_create(self, serializer):
         # Photos are saved directly (NO TEMP, NO FINALIZE)
@@ -69,47 +75,184 @@ class ProductCreateView(generics.CreateAPIView):
 
 
 
-class ProductListAPIView(generics.ListAPIView):
+# ============================
+#     CHUNKED PHOTO UPLOADS
+# ============================
+
+class PhotoUploadCreateView(generics.CreateAPIView):
+    """
+    Start a resumable photo upload
+    POST /product/uploads/  {"filename": "a.jpg", "total_size": 9437184}
+    Then PUT the bytes to /product/uploads/{uid}/ in chunks and pass the
+    finished uid in `uploads` when creating/updating the product.
+    """
+    serializer_class = PhotoUploadSerializer
+    permission_classes = [IsAuthenticated, IsSeller]
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class PhotoUploadChunkView(APIView):
+    """
+    GET  /product/uploads/{uid}/  -> progress, resume from `received_bytes`
+    PUT  /product/uploads/{uid}/  raw chunk body with
+         `Content-Range: bytes <start>-<end>/<total>`
+    The body is streamed straight to disk; it is never parsed or buffered.
+    """
+    permission_classes = [IsAuthenticated, IsSeller]
+
+    def get_upload(self, uid, lock=False):
+        queryset = PhotoUpload.objects.filter(owner=self.request.user)
+        if lock:
+            queryset = queryset.select_for_update()
+        return get_object_or_404(queryset, uid=uid)
+
+    def get(self, request, uid):
+        return Response(PhotoUploadSerializer(self.get_upload(uid)).data)
+
+    def put(self, request, uid):
+        upload = self.get_upload(uid, lock=True)
+        if upload.status == 'complete':
+            return Response(PhotoUploadSerializer(upload).data)
+
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        offset, length, total = parse_content_range(
+            request.META.get('HTTP_CONTENT_RANGE'), content_length
+        )
+        if total is not None and total != upload.total_size:
+            return Response(
+                {'error': 'Content-Range total does not match total_size'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        write_chunk(upload, request.stream, offset, length)
+        return Response(PhotoUploadSerializer(upload).data)
+
+    def delete(self, request, uid):
+        self.get_upload(uid).discard()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+
+class ProductListAPIView(CatalogueCacheMixin, generics.ListAPIView):
+    """
+    Active products feed.
+
+    Default pagination is limit/offset. Pass `?pagination=cursor` (or follow
+    a `next`/`previous` link that carries `cursor`) to switch to keyset
+    pagination; in that mode `total_count` is only computed with
+    `?with_count=true`. A `?search=` is ranked by relevance, which keyset
+    pages cannot seek on, so cursor mode with a search needs `?ordering=`.
+
+    `?view=card` renders slim ProductListSerializer cards and
+    `?fields=uid,name,cost,photos` keeps only the listed fields; either
+    way only the columns those fields read are selected.
+    """
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
 
     filter_backends = [
-        DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter
+        DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter
     ]
 
-    filterset_fields = ['category', 'owner', 'location']
+    filterset_class = ProductListFilterSet
     search_fields = ['name', 'description', 'location']
-    ordering_fields = ['created_at', 'updated_at', 'cost', 'name']
+    ordering_fields = ['created_at', 'updated_at', 'cost', 'name', 'rating_avg']
     ordering = ['-created_at']
 
+    def get_serializer_class(self):
+        if self.request.query_params.get('view') == 'card':
+            return ProductListSerializer
+        return ProductSerializer
+
+    def get_sparse_fields(self):
+        """Requested `?fields=` (validated), or None for all of them"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            value = self.request.query_params.get('fields')
+            if value:
+                requested = [name.strip() for name in value.split(',') if name.strip()]
+                allowed = self.get_serializer_class().Meta.fields
+                unknown = [name for name in requested if name not in allowed]
+                if unknown:
+                    raise serializers.ValidationError({
+                        'fields': f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+                    })
+                self._sparse_fields = requested
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
     def get_queryset(self):
+        # owner/category render as pks, so no joins; the keyset paginator
+        # reads the ordering column back from the last row
+        columns = self.get_serializer_class().model_columns(self.get_sparse_fields())
+        columns.update(['created_at'] + [name.lstrip('-') for name in self.get_ordering_terms()])
         return Product.objects.filter(
             status='active'
-        ).select_related('owner', 'category').order_by('-created_at')
+        ).only(*columns).order_by('-created_at')
+
+    def get_ordering_terms(self):
+        return ProductOrderingFilter().get_ordering(self.request, Product.objects.none(), self) or []
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        cursor = (
+            params.get('pagination') == 'cursor'
+            or ProductCursorPagination.cursor_query_param in params
+        )
+        searching = ProductSearchFilter().get_search_terms(self.request)
+        if cursor and searching and not params.get(ProductOrderingFilter.ordering_param):
+            # Keyset pages seek on a column; a relevance rank is not one
+            raise serializers.ValidationError({
+                'pagination': "Cursor pagination cannot keep search relevance order. "
+                              "Pass ?ordering= or use limit/offset pages."
+            })
+        return cursor
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = ProductCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
     def list(self, request, *args, **kwargs):
 
         queryset = self.filter_queryset(self.get_queryset())
 
         page = self.paginate_queryset(queryset)
-        if page:
+        if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response({
+            payload = {
                 'products': serializer.data,
-                'total_count': queryset.count(),
                 'timestamp': timezone.now().isoformat(),
-            })
+            }
+            if isinstance(self.paginator, ProductCursorPagination):
+                if self.paginator.total_count is not None:
+                    payload['total_count'] = self.paginator.total_count
+            else:
+                payload['total_count'] = self.paginator.count
+            return self.get_paginated_response(payload)
 
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'products': serializer.data,
-            'total_count': queryset.count(),
+            'total_count': len(serializer.data),
             'timestamp': timezone.now().isoformat(),
         })
 
 
 
-class ProductRetrieveView(generics.RetrieveAPIView):
+class ProductRetrieveView(CatalogueCacheMixin, generics.RetrieveAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer   # NO COMMENTS ANYMORE
     lookup_field = 'uid'
@@ -118,7 +261,7 @@ class ProductRetrieveView(generics.RetrieveAPIView):
 
 class ProductUpdateView(generics.UpdateAPIView):
     serializer_class = ProductCreateUpdateSerializer
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
     lookup_field = 'uid'
     # permission_classes = [IsAuthenticated, IsSeller]
 
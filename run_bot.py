@@ -2,13 +2,23 @@
 """
 Telegram Bot Runner for PythonAnywhere
 This script runs the Telegram bot using polling
+
+    python run_bot.py               # single process (default)
+    python run_bot.py --workers 4   # one poller + 4 sharded worker processes
+
+BOT_WORKERS sets the default worker count. Run exactly one copy of this
+script per bot token: Telegram answers a second getUpdates poller with
+409 Conflict. Scale with --workers on one host; running on several hosts
+needs webhooks instead of polling.
 """
 
 import os
 import sys
 import django
+import argparse
 import asyncio
 import logging
+import multiprocessing
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -16,6 +26,7 @@ django.setup()
 
 # Now import bot after Django setup
 from tg_bot.bot import main
+from tg_bot.sharding import poll, run_worker
 
 # Setup logging
 logging.basicConfig(
@@ -24,10 +35,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def run_sharded(workers):
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue() for _ in range(workers)]
+    processes = [
+        context.Process(target=run_worker, args=(index, queue), name=f'bot-worker-{index}')
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        asyncio.run(poll(queues))
+    finally:
+        # Let workers drain what they already received, then stop
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join(timeout=30)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Telegram bot")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BOT_WORKERS', 1)))
+    args = parser.parse_args()
+
     logger.info("Starting Telegram Bot on PythonAnywhere...")
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            logger.info(f"Sharded mode: 1 poller + {args.workers} workers")
+            run_sharded(args.workers)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import random
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class BackendClient:
+    """
+    Long-lived HTTP client for the Django backend, owned by the bot's main().
+
+    One pooled aiohttp session (keep-alive connections, per-host limit, DNS
+    cache) instead of a session + TCP/TLS handshake per message, a semaphore
+    bounding in-flight backend calls, timeouts on every request and
+    jittered exponential retries on connection errors and 5xx responses.
+    Only use it for idempotent calls: retried requests may run twice.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        limit_per_host=int(os.getenv('BOT_BACKEND_CONNECTIONS', 20)),
+        max_in_flight=int(os.getenv('BOT_BACKEND_MAX_IN_FLIGHT', 50)),
+        timeout=float(os.getenv('BOT_BACKEND_TIMEOUT', 10)),
+        retries=int(os.getenv('BOT_BACKEND_RETRIES', 3)),
+        backoff=float(os.getenv('BOT_BACKEND_BACKOFF', 0.5)),
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, 5))
+        self.retries = retries
+        self.backoff = backoff
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.session = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={'Content-Type': 'application/json'},
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def retry_delay(self, attempt):
+        """Full jitter: uniform in [0, backoff * 2^attempt], capped at 10s"""
+        return random.uniform(0, min(10, self.backoff * 2 ** attempt))
+
+    async def post_json(self, path, payload):
+        """
+        POST `payload` as JSON, returning (status, body text). Raises
+        aiohttp.ClientError / asyncio.TimeoutError once retries run out;
+        a 5xx that persists is returned like any other response.
+        """
+        url = f"{self.base_url}{path}"
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                last_attempt = attempt == self.retries
+                try:
+                    async with self.session.post(url, json=payload) as resp:
+                        text = await resp.text()
+                        if resp.status < 500 or last_attempt:
+                            return resp.status, text
+                        logger.warning(f"Backend {resp.status} on {path}, retry {attempt + 1}/{self.retries}")
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if last_attempt:
+                        raise
+                    logger.warning(f"Backend error on {path}: {e!r}, retry {attempt + 1}/{self.retries}")
+                await asyncio.sleep(self.retry_delay(attempt))
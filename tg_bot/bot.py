@@ -1,3 +1,5 @@
+import asyncio
+import json
 import logging
 import aiohttp
 import hashlib
@@ -5,7 +7,6 @@ import hmac
 import time
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
@@ -19,6 +20,8 @@ from aiogram.types import (
 )
 from aiogram.filters import CommandStart
 from aiogram.client.default import DefaultBotProperties
+from tg_bot.backend import BackendClient
+from tg_bot.storage import build_fsm_storage
 from tg_bot.tokens import *
 
 # Enhanced logging
@@ -32,7 +35,8 @@ bot = Bot(
     token=BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
-dp = Dispatcher(storage=MemoryStorage())
+# Memory / Redis / fakeredis, see tg_bot.storage (BOT_FSM_STORAGE)
+dp = Dispatcher(storage=build_fsm_storage())
 
 
 # FSM States
@@ -116,7 +120,7 @@ async def start_handler(message: Message, state: FSMContext):
 
 
 @dp.message(RegistrationStates.waiting_for_phone, F.contact)
-async def phone_received_handler(message: Message, state: FSMContext):
+async def phone_received_handler(message: Message, state: FSMContext, backend: BackendClient):
     """
     Telefon raqami qabul qilish va autentifikatsiya
     """
@@ -163,102 +167,96 @@ async def phone_received_handler(message: Message, state: FSMContext):
     ])
 
     # Django backend ga registration/login so'rovi
-    logger.info(f"Sending auth data to Django: {auth_data}")
-
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                    f"{API_URL}/user/auth/telegram/",
-                    json=auth_data,
-                    headers={'Content-Type': 'application/json'}
-            ) as resp:
-                response_text = await resp.text()
-                logger.info(f"API Response Status: {resp.status}")
-                logger.info(f"API Response Body: {response_text[:500]}")
-
-                if resp.status == 200:
-                    try:
-                        response_data = await resp.json()
-
-                        success = response_data.get('success')
-                        created = response_data.get('created')
-                        user_data_response = response_data.get('user', {})
-
-                        if success:
-                            user_name = user_data_response.get('name', first_name)
-
-                            if created:
-                                logger.info(f"New user created: {telegram_id}")
-                                await message.answer(
-                                    f"🎉 Welcome to Marketplace, <b>{user_name}</b>!\n\n"
-                                    f"✅ Your account has been created successfully.\n"
-                                    f"📱 Phone: {phone_number}\n"
-                                    f"🔐 You are now logged in.\n\n"
-                                    f"Click the button below to open the marketplace! 👇",
-                                    reply_markup=ReplyKeyboardRemove()
-                                )
-                                await message.answer(
-                                    "🛒 <b>Open Marketplace</b>",
-                                    reply_markup=keyboard
-                                )
-                            else:
-                                logger.info(f"Existing user logged in: {telegram_id}")
-                                await message.answer(
-                                    f"👋 Welcome back, <b>{user_name}</b>!\n\n"
-                                    f"✅ You are now logged in.\n"
-                                    f"📱 Phone: {phone_number}\n\n"
-                                    f"Click the button below to open the marketplace! 👇",
-                                    reply_markup=ReplyKeyboardRemove()
-                                )
-                                await message.answer(
-                                    "🛒 <b>Open Marketplace</b>",
-                                    reply_markup=keyboard
-                                )
-
-                            logger.info(f"Access token received for user {telegram_id}")
-                            await state.clear()
-
-                        else:
-                            logger.warning(f"Authentication failed for user {telegram_id}")
-                            await message.answer(
-                                "⚠️ Authentication failed. Please try again with /start",
-                                reply_markup=ReplyKeyboardRemove()
-                            )
-                            await state.clear()
-
-                    except Exception as json_error:
-                        logger.error(f"Error parsing JSON response: {json_error}")
-                        logger.error(f"Raw response: {response_text}")
+    logger.info(f"Sending auth data to Django for user {telegram_id}")
+
+    try:
+        # Pooled client from main(); retries 5xx / network errors (login is an idempotent upsert)
+        status_code, response_text = await backend.post_json("/user/auth/telegram/", auth_data)
+        logger.info(f"API Response Status: {status_code}")
+
+        if status_code == 200:
+            try:
+                response_data = json.loads(response_text)
+
+                success = response_data.get('success')
+                created = response_data.get('created')
+                user_data_response = response_data.get('user', {})
+
+                if success:
+                    user_name = user_data_response.get('name', first_name)
+
+                    if created:
+                        logger.info(f"New user created: {telegram_id}")
+                        await message.answer(
+                            f"🎉 Welcome to Marketplace, <b>{user_name}</b>!\n\n"
+                            f"✅ Your account has been created successfully.\n"
+                            f"📱 Phone: {phone_number}\n"
+                            f"🔐 You are now logged in.\n\n"
+                            f"Click the button below to open the marketplace! 👇",
+                            reply_markup=ReplyKeyboardRemove()
+                        )
+                        await message.answer(
+                            "🛒 <b>Open Marketplace</b>",
+                            reply_markup=keyboard
+                        )
+                    else:
+                        logger.info(f"Existing user logged in: {telegram_id}")
                         await message.answer(
-                            "⚠️ Server error. Please try again later.",
+                            f"👋 Welcome back, <b>{user_name}</b>!\n\n"
+                            f"✅ You are now logged in.\n"
+                            f"📱 Phone: {phone_number}\n\n"
+                            f"Click the button below to open the marketplace! 👇",
                             reply_markup=ReplyKeyboardRemove()
                         )
-                        await state.clear()
+                        await message.answer(
+                            "🛒 <b>Open Marketplace</b>",
+                            reply_markup=keyboard
+                        )
+
+                    logger.info(f"Access token received for user {telegram_id}")
+                    await state.clear()
 
                 else:
-                    logger.warning(f"Authentication failed with status {resp.status}")
-                    logger.warning(f"Response: {response_text[:500]}")
+                    logger.warning(f"Authentication failed for user {telegram_id}")
                     await message.answer(
                         "⚠️ Authentication failed. Please try again with /start",
                         reply_markup=ReplyKeyboardRemove()
                     )
                     await state.clear()
 
-        except aiohttp.ClientError as e:
-            logger.error(f"Network error during authentication: {e}")
-            await message.answer(
-                "⚠️ Network error. Please check your connection and try /start again.",
-                reply_markup=ReplyKeyboardRemove()
-            )
-            await state.clear()
-        except Exception as e:
-            logger.error(f"Unexpected error during authentication: {e}", exc_info=True)
+            except Exception as json_error:
+                logger.error(f"Error parsing JSON response: {json_error}")
+                logger.error(f"Raw response: {response_text}")
+                await message.answer(
+                    "⚠️ Server error. Please try again later.",
+                    reply_markup=ReplyKeyboardRemove()
+                )
+                await state.clear()
+
+        else:
+            logger.warning(f"Authentication failed with status {status_code}")
+            logger.warning(f"Response: {response_text[:500]}")
             await message.answer(
-                "⚠️ An unexpected error occurred. Please try /start again.",
+                "⚠️ Authentication failed. Please try again with /start",
                 reply_markup=ReplyKeyboardRemove()
             )
             await state.clear()
 
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Network error during authentication: {e}")
+        await message.answer(
+            "⚠️ Network error. Please check your connection and try /start again.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        await state.clear()
+    except Exception as e:
+        logger.error(f"Unexpected error during authentication: {e}", exc_info=True)
+        await message.answer(
+            "⚠️ An unexpected error occurred. Please try /start again.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        await state.clear()
+
 
 @dp.message(RegistrationStates.waiting_for_phone)
 async def invalid_phone_handler(message: Message):
@@ -286,12 +284,17 @@ async def echo_handler(message: Message):
 # Run bot
 async def main():
     logger.info("Starting bot...")
-    await dp.start_polling(bot)
+    # One pooled backend client for the bot's lifetime, injected into handlers
+    backend = BackendClient(API_URL)
+    await backend.start()
+    try:
+        await dp.start_polling(bot, backend=backend)
+    finally:
+        await backend.close()
+        await dp.storage.close()
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
 
 
@@ -0,0 +1,130 @@
+"""
+Sharded bot runner: one process long-polls Telegram and fans updates out
+to N worker processes, each running its own event loop and Dispatcher.
+
+Updates are routed by chat id, so one chat always lands on the same
+worker and is handled in order there; different chats run concurrently.
+With the Redis FSM storage (tg_bot.storage) the workers share
+registration state.
+
+Only one getUpdates poller may run per bot token: a second one makes
+Telegram answer 409 Conflict. Scale on one host by adding workers;
+spreading the bot across hosts needs webhooks instead of polling.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+# Concurrent updates a worker processes at once (across different chats)
+WORKER_CONCURRENCY = int(os.getenv('BOT_WORKER_CONCURRENCY', 100))
+
+
+def shard_key(update):
+    """Chat id of the update (user id / update id as fallbacks)"""
+    event = update.event
+    chat = getattr(event, 'chat', None) or getattr(getattr(event, 'message', None), 'chat', None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, 'from_user', None)
+    return user.id if user is not None else update.update_id
+
+
+# ============================
+#        POLLER
+# ============================
+
+async def poll(queues):
+    """Long-poll getUpdates and route every update to its shard's queue"""
+    from tg_bot.bot import bot, dp
+
+    allowed_updates = dp.resolve_used_update_types()
+    offset = None
+    logger.info(f"Polling for {len(queues)} worker(s)...")
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=30, allowed_updates=allowed_updates
+                )
+            except Exception as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                queue = queues[shard_key(update) % len(queues)]
+                queue.put(update.model_dump(mode='json', exclude_unset=True))
+    finally:
+        await bot.session.close()
+
+
+# ============================
+#        WORKERS
+# ============================
+
+def run_worker(index, queue):
+    """Process entry point; Django is already set up by run_bot.py (re-imported on spawn)"""
+    try:
+        asyncio.run(work(index, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def work(index, queue):
+    from tg_bot.backend import BackendClient
+    from tg_bot.bot import bot, dp
+    from tg_bot.tokens import API_URL
+
+    backend = BackendClient(API_URL)
+    await backend.start()
+
+    loop = asyncio.get_running_loop()
+    # Per-chat lock plus the number of handlers holding or waiting on it;
+    # the lock is dropped only when nobody references it any more
+    chat_locks = {}
+    chat_waiters = defaultdict(int)
+    slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+    tasks = set()
+
+    async def handle(data):
+        key = None
+        try:
+            update = Update.model_validate(data, context={'bot': bot})
+            key = shard_key(update)
+            lock = chat_locks.setdefault(key, asyncio.Lock())
+            chat_waiters[key] += 1
+            async with lock:
+                await dp.feed_update(bot, update, backend=backend)
+        except Exception as e:
+            logger.error(f"Update {data.get('update_id')} failed: {e}", exc_info=True)
+        finally:
+            if key is not None:
+                chat_waiters[key] -= 1
+                if not chat_waiters[key]:
+                    del chat_waiters[key]
+                    del chat_locks[key]
+            slots.release()
+
+    logger.info(f"Worker {index} started")
+    try:
+        while True:
+            data = await loop.run_in_executor(None, queue.get)
+            if data is None:
+                break
+            await slots.acquire()
+            task = asyncio.create_task(handle(data))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        await backend.close()
+        await dp.storage.close()
+        await bot.session.close()
@@ -0,0 +1,43 @@
+import logging
+import os
+
+from aiogram.fsm.storage.base import DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+
+# In-flight registrations expire with the 24h auth_date window of the backend
+FSM_TTL = int(os.getenv('BOT_FSM_TTL', 24 * 60 * 60))
+
+
+def build_fsm_storage():
+    """
+    FSM storage chosen by BOT_FSM_STORAGE:
+    - redis: shared by every bot worker process, survives restarts
+      (BOT_FSM_REDIS_URL, else REDIS_URL); state and data expire after BOT_FSM_TTL
+    - fakeredis: the Redis code path in-process, for tests
+    - memory: single process, lost on restart
+    Defaults to redis when REDIS_URL is set, memory otherwise.
+    """
+    redis_url = os.getenv('BOT_FSM_REDIS_URL') or os.getenv('REDIS_URL', '')
+    backend = os.getenv('BOT_FSM_STORAGE', 'redis' if redis_url else 'memory')
+
+    if backend in ('redis', 'fakeredis'):
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        options = dict(
+            key_builder=DefaultKeyBuilder(prefix='bot_fsm'),
+            state_ttl=FSM_TTL,
+            data_ttl=FSM_TTL,
+        )
+        if backend == 'fakeredis':
+            from fakeredis.aioredis import FakeRedis
+            return RedisStorage(redis=FakeRedis(), **options)
+
+        logger.info("Using Redis FSM storage")
+        return RedisStorage.from_url(redis_url or 'redis://127.0.0.1:6379/0', **options)
+
+    if backend != 'memory':
+        raise ValueError(f"Unknown BOT_FSM_STORAGE: {backend}")
+    return MemoryStorage()
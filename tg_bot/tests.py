@@ -0,0 +1,134 @@
+import asyncio
+import os
+from unittest import IsolatedAsyncioTestCase, TestCase, mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from tg_bot.backend import BackendClient
+from tg_bot.sharding import shard_key
+from tg_bot.storage import FSM_TTL, build_fsm_storage
+
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+class FsmStorageTests(IsolatedAsyncioTestCase):
+    def build(self, **environ):
+        with mock.patch.dict(os.environ, environ, clear=True):
+            storage = build_fsm_storage()
+        self.addAsyncCleanup(storage.close)
+        return storage
+
+    async def test_memory_storage_without_redis(self):
+        storage = self.build()
+        self.assertIsInstance(storage, MemoryStorage)
+
+        await storage.set_state(KEY, 'Registration:phone')
+        self.assertEqual(await storage.get_state(KEY), 'Registration:phone')
+
+    async def test_unknown_backend_is_rejected(self):
+        with mock.patch.dict(os.environ, {'BOT_FSM_STORAGE': 'sqlite'}, clear=True):
+            with self.assertRaises(ValueError):
+                build_fsm_storage()
+
+    async def test_fakeredis_storage_keeps_state_and_data_with_ttl(self):
+        storage = self.build(BOT_FSM_STORAGE='fakeredis')
+
+        await storage.set_state(KEY, 'Registration:phone')
+        await storage.update_data(KEY, {'name': 'Ali'})
+        await storage.update_data(KEY, {'phone': '+998901234567'})
+
+        self.assertEqual(await storage.get_state(KEY), 'Registration:phone')
+        self.assertEqual(await storage.get_data(KEY), {'name': 'Ali', 'phone': '+998901234567'})
+
+        keys = await storage.redis.keys('*')
+        self.assertTrue(keys)
+        for key in keys:
+            self.assertTrue(key.decode().startswith('bot_fsm:'))
+            self.assertTrue(0 < await storage.redis.ttl(key) <= FSM_TTL)
+
+        await storage.set_state(KEY, None)
+        self.assertIsNone(await storage.get_state(KEY))
+
+
+class ShardKeyTests(TestCase):
+    chat = {'id': 42, 'type': 'private'}
+    user = {'id': 7, 'is_bot': False, 'first_name': 'Ali'}
+
+    def update(self, **event):
+        return Update.model_validate({'update_id': 1000, **event})
+
+    def test_messages_shard_by_chat(self):
+        update = self.update(message={'message_id': 1, 'date': 0, 'chat': self.chat, 'from': self.user})
+        self.assertEqual(shard_key(update), 42)
+
+    def test_callback_queries_follow_their_message_chat(self):
+        update = self.update(callback_query={
+            'id': 'cb', 'chat_instance': 'x', 'from': self.user,
+            'message': {'message_id': 1, 'date': 0, 'chat': self.chat},
+        })
+        self.assertEqual(shard_key(update), 42)
+
+    def test_chatless_updates_fall_back_to_the_user(self):
+        update = self.update(inline_query={'id': 'q', 'from': self.user, 'query': '', 'offset': ''})
+        self.assertEqual(shard_key(update), 7)
+
+
+class BackendClientTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.statuses = []
+        self.peers = set()
+        self.in_flight = self.max_in_flight = 0
+
+        async def handler(request):
+            self.peers.add(request.transport.get_extra_info('peername'))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            status = self.statuses.pop(0) if self.statuses else 200
+            return web.json_response(await request.json(), status=status)
+
+        app = web.Application()
+        app.router.add_post('/user/auth/telegram/', handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+    async def client(self, **options):
+        options.setdefault('backoff', 0)
+        client = BackendClient(str(self.server.make_url('/')), **options)
+        await client.start()
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_5xx_is_retried_over_one_kept_alive_connection(self):
+        self.statuses = [503, 502]
+        client = await self.client(retries=3)
+
+        status, body = await client.post_json('/user/auth/telegram/', {'id': 42})
+
+        self.assertEqual((status, body), (200, '{"id": 42}'))
+        self.assertEqual(len(self.peers), 1)
+
+    async def test_persistent_5xx_and_4xx_are_returned(self):
+        client = await self.client(retries=2)
+
+        self.statuses = [500, 500, 500, 500]
+        self.assertEqual((await client.post_json('/user/auth/telegram/', {}))[0], 500)
+        self.assertEqual(len(self.statuses), 1)
+
+        self.statuses = [400, 500]
+        self.assertEqual((await client.post_json('/user/auth/telegram/', {}))[0], 400)
+        self.assertEqual(self.statuses, [500])
+
+    async def test_in_flight_calls_are_bounded(self):
+        client = await self.client(max_in_flight=2)
+
+        await asyncio.gather(*(client.post_json('/user/auth/telegram/', {'n': n}) for n in range(6)))
+
+        self.assertEqual(self.max_in_flight, 2)
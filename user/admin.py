@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
+from .cache import invalidate_principals
 from .models import User, UserLoginHistory
 
 
@@ -66,12 +67,14 @@ class UserAdmin(BaseUserAdmin):
     actions = ['activate_users', 'deactivate_users', 'soft_delete_users', 'restore_users']
 
     def activate_users(self, request, queryset):
+        invalidate_principals(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=True)
         self.message_user(request, f'{updated} user(s) successfully activated.')
 
     activate_users.short_description = "Activate selected users"
 
     def deactivate_users(self, request, queryset):
+        invalidate_principals(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=False)
         self.message_user(request, f'{updated} user(s) successfully deactivated.')
 
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cache import invalidate_principals
+from .models import User, UserLoginHistory
+from .telegram_auth import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+
+class LoginEventBuffer:
+    """
+    In-process buffer of login events, written off the request path.
+
+    Requests only append to a list; a daemon thread flushes it every
+    LOGIN_AUDIT_FLUSH_INTERVAL seconds (or once LOGIN_AUDIT_BATCH_SIZE
+    events are waiting) with one bulk_create of UserLoginHistory plus one
+    bulk_update of User.last_login_at, coalesced to the latest login per
+    user and never older than the stored value. Whatever is still buffered
+    is flushed at interpreter exit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.events = []
+        self.last_logins = {}
+        self.thread = None
+
+    def record(self, user_id, ip_address, user_agent, success, at, update_last_login=True):
+        with self.lock:
+            self.events.append((user_id, ip_address, user_agent, success, at))
+            if success and update_last_login:
+                self.last_logins[user_id] = max(at, self.last_logins.get(user_id, at))
+            pending = len(self.events)
+            self.ensure_worker()
+        if pending >= settings.LOGIN_AUDIT_BATCH_SIZE:
+            self.wakeup.set()
+
+    def ensure_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='login-audit', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(settings.LOGIN_AUDIT_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Login audit flush failed: {e}", exc_info=True)
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        with self.lock:
+            events, self.events = self.events, []
+            last_logins, self.last_logins = self.last_logins, {}
+        if not events:
+            return 0
+
+        with transaction.atomic():
+            UserLoginHistory.objects.bulk_create([
+                UserLoginHistory(
+                    user_id=user_id, ip_address=ip_address, user_agent=user_agent,
+                    success=success, login_time=at
+                )
+                for user_id, ip_address, user_agent, success, at in events
+            ], batch_size=settings.LOGIN_AUDIT_BATCH_SIZE)
+            # Greatest: a synchronous login written meanwhile (or a later
+            # flush that won the race) is never moved back
+            User.objects.bulk_update(
+                [
+                    User(uid=user_id, last_login_at=Greatest(F('last_login_at'), Value(at)))
+                    for user_id, at in last_logins.items()
+                ],
+                ['last_login_at'], batch_size=settings.LOGIN_AUDIT_BATCH_SIZE
+            )
+            invalidate_principals(last_logins)
+        return len(events)
+
+
+login_events = LoginEventBuffer()
+atexit.register(login_events.flush)
+
+
+def record_login(user, request, success=True, update_last_login=True):
+    """
+    Queue a login event for `user`. Queued on commit, so a user created in
+    the same request exists by the time the event is written; with
+    LOGIN_AUDIT_SYNC it is written right after commit instead (tests).
+    Pass update_last_login=False when the caller already wrote last_login_at.
+    """
+    event = (
+        user.pk, get_client_ip(request), request.META.get('HTTP_USER_AGENT', ''),
+        success, timezone.now()
+    )
+    if success and update_last_login:
+        # Responses serialize `user` before the buffered UPDATE lands
+        user.last_login_at = event[-1]
+
+    def enqueue():
+        login_events.record(*event, update_last_login=update_last_login)
+        if settings.LOGIN_AUDIT_SYNC:
+            login_events.flush()
+
+    transaction.on_commit(enqueue)
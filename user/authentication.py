@@ -0,0 +1,102 @@
+import uuid
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import get_cached_principal, set_cached_principal
+from .models import User
+
+
+# Read by user.permissions and the auth rule; embedded in tokens we issue
+PRINCIPAL_CLAIMS = ('role', 'is_active', 'is_admin')
+
+# The password hash never goes to the cache; it stays deferred on cached
+# principals and is loaded lazily (check_password) or kept out of save()
+PRINCIPAL_FIELDS = [
+    field.attname for field in User._meta.concrete_fields if field.attname != 'password'
+]
+
+
+class PrincipalRefreshToken(RefreshToken):
+    """RefreshToken whose (and whose access tokens') payload carries PRINCIPAL_CLAIMS"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in PRINCIPAL_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a User query per request.
+
+    The principal row is read from a short-TTL, versioned cache entry
+    (user.cache), dropped whenever the user is saved; a token whose
+    principal claims no longer match that row is rejected. With
+    AUTH_TRUST_TOKEN_CLAIMS the role/is_active/is_admin claims of our own
+    tokens are trusted instead and no lookup happens at all; other fields
+    load lazily if a view touches them. Trusted claims only change on
+    re-login, so keep that off unless tokens are short-lived.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the current password hash: always ask the database
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = None
+        if settings.AUTH_TRUST_TOKEN_CLAIMS:
+            user = self.get_user_from_claims(user_id, validated_token)
+        if user is None:
+            user = self.get_cached_user(user_id)
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if self.claims_are_stale(user, validated_token):
+                raise AuthenticationFailed(_("Token claims are out of date"), code="token_claims_stale")
+
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def get_user_from_claims(self, user_id, validated_token):
+        if any(claim not in validated_token for claim in PRINCIPAL_CLAIMS):
+            return None
+        return User.from_db(
+            DEFAULT_DB_ALIAS,
+            ['uid', *PRINCIPAL_CLAIMS],
+            [uuid.UUID(str(user_id)), *(validated_token[claim] for claim in PRINCIPAL_CLAIMS)],
+        )
+
+    def claims_are_stale(self, user, validated_token):
+        """
+        A token of ours whose role/is_active/is_admin no longer match the
+        row (role changed, user deactivated) must not keep working: the
+        client logs in again and gets a token with the current claims
+        """
+        return any(
+            claim in validated_token and validated_token[claim] != getattr(user, claim)
+            for claim in PRINCIPAL_CLAIMS
+        )
+
+    def get_cached_user(self, user_id):
+        row = get_cached_principal(user_id)
+        if row is None:
+            row = User.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*PRINCIPAL_FIELDS).first()
+            if row is None:
+                return None
+            set_cached_principal(user_id, row)
+        return User.from_db(DEFAULT_DB_ALIAS, PRINCIPAL_FIELDS, row)
@@ -0,0 +1,45 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the cached row layout changes so old entries are never read
+PRINCIPAL_CACHE_VERSION = 1
+
+
+def principal_cache_key(user_id):
+    return f"auth:principal:v{PRINCIPAL_CACHE_VERSION}:{user_id}"
+
+
+def get_cached_principal(user_id):
+    try:
+        return cache.get(principal_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Principal cache read failed: {e}")
+        return None
+
+
+def set_cached_principal(user_id, row):
+    try:
+        cache.set(principal_cache_key(user_id), row, settings.AUTH_PRINCIPAL_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Principal cache write failed: {e}")
+
+
+def invalidate_principals(user_ids):
+    """Drop cached principals once the surrounding transaction commits"""
+    keys = [principal_cache_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+
+    def delete():
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    transaction.on_commit(delete)
@@ -0,0 +1,98 @@
+import hashlib
+import hmac
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from user.audit import login_events
+from user.models import User
+from user.telegram_auth import derive_secret_key
+from user.views import telegram_auth_view
+
+# Synthetic accounts live far above real Telegram ids and are removed afterwards
+BENCHMARK_TELEGRAM_ID_BASE = 9_000_000_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure sustained Telegram logins/sec of one worker: signed payloads "
+        "through telegram_auth_view against the real database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Distinct synthetic users")
+        parser.add_argument('--logins', type=int, default=2000, help="Total login requests")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic users")
+
+    def handle(self, *args, **options):
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError("TELEGRAM_BOT_TOKEN must be set to sign benchmark payloads")
+
+        users, logins = options['users'], options['logins']
+        factory = APIRequestFactory()
+        payloads = [self.signed_payload(index) for index in range(users)]
+
+        timings = []
+        outcomes = {'created': 0, 'logged_in': 0, 'failed': 0}
+        started = time.perf_counter()
+        for number in range(logins):
+            request = factory.post('/user/auth/telegram/', payloads[number % users], format='json')
+            request_started = time.perf_counter()
+            response = telegram_auth_view(request)
+            timings.append(time.perf_counter() - request_started)
+
+            if response.status_code != 200:
+                outcomes['failed'] += 1
+            elif response.data['created']:
+                outcomes['created'] += 1
+            else:
+                outcomes['logged_in'] += 1
+
+            if (number + 1) % 500 == 0:
+                self.stdout.write(f"{number + 1} login(s)...")
+        elapsed = time.perf_counter() - started
+
+        # The buffered history writes are part of the cost, flush them too
+        flush_started = time.perf_counter()
+        login_events.flush()
+        flush_elapsed = time.perf_counter() - flush_started
+
+        timings.sort()
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+        self.stdout.write(
+            f"{logins} login(s) in {elapsed:.2f}s: {logins / elapsed:.1f} logins/sec\n"
+            f"latency ms: p50 {percentile(0.50):.2f}, p95 {percentile(0.95):.2f}, "
+            f"p99 {percentile(0.99):.2f}, mean {statistics.mean(timings) * 1000:.2f}\n"
+            f"created {outcomes['created']}, logged in {outcomes['logged_in']}, "
+            f"failed {outcomes['failed']}\n"
+            f"audit flush: {flush_elapsed * 1000:.1f}ms"
+        )
+
+        if not options['keep']:
+            deleted, _ = User.objects.filter(
+                telegram_id__gte=BENCHMARK_TELEGRAM_ID_BASE,
+                telegram_id__lt=BENCHMARK_TELEGRAM_ID_BASE + users,
+            ).delete()
+            self.stdout.write(f"{deleted} synthetic row(s) removed")
+
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def signed_payload(self, index):
+        """Payload signed exactly like the Telegram Web App would sign it"""
+        data = {
+            'id': BENCHMARK_TELEGRAM_ID_BASE + index,
+            'first_name': 'Benchmark',
+            'last_name': str(index),
+            'phone_number': f"+99800{index:07d}",
+            'auth_date': int(time.time()),
+        }
+        data_check_string = '\n'.join(f"{key}={value}" for key, value in sorted(data.items()))
+        data['hash'] = hmac.new(
+            key=derive_secret_key(settings.TELEGRAM_BOT_TOKEN),
+            msg=data_check_string.encode(),
+            digestmod=hashlib.sha256
+        ).hexdigest()
+        return data
@@ -1,9 +1,11 @@
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connections, models
 from django.utils import timezone
 
+from .cache import invalidate_principals
+
 PHONE_REGEX = RegexValidator(
     regex=r"^\+998([0-9][0-9]|99)\d{7}$",
     message="Please provide a valid phone number",
@@ -46,6 +48,58 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email, name, password, **extra_fields)
 
+    def upsert_telegram_user(self, telegram_id, email, name, username, phone_number, login_at):
+        """
+        Telegram login in one statement: INSERT ... ON CONFLICT (telegram_id)
+        DO UPDATE ... RETURNING. New users are inserted as clients; existing
+        ones get the new phone number (if any), are restored if soft-deleted
+        and get last_login_at. Returns (user, created).
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        fields = self.model._meta.concrete_fields
+
+        candidate = self.model(
+            telegram_id=telegram_id, email=email, name=name, username=username,
+            phone_number=phone_number or None, role='client', is_active=True,
+            last_login_at=login_at,
+        )
+        values = [
+            field.get_db_prep_save(field.pre_save(candidate, True), connection)
+            for field in fields
+        ]
+
+        def col(name):
+            return qn(self.model._meta.get_field(name).column)
+
+        changed = (
+            f"(EXCLUDED.{col('phone_number')} IS NOT NULL "
+            f"AND EXCLUDED.{col('phone_number')} IS DISTINCT FROM {table}.{col('phone_number')}) "
+            f"OR {table}.{col('is_deleted')}"
+        )
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({col('telegram_id')}) DO UPDATE SET "
+            f"{col('phone_number')} = COALESCE(EXCLUDED.{col('phone_number')}, {table}.{col('phone_number')}), "
+            f"{col('is_active')} = {table}.{col('is_active')} OR {table}.{col('is_deleted')}, "
+            f"{col('is_deleted')} = FALSE, "
+            f"{col('deleted_at')} = NULL, "
+            f"{col('last_login_at')} = EXCLUDED.{col('last_login_at')}, "
+            f"{col('updated_at')} = CASE WHEN {changed} "
+            f"THEN EXCLUDED.{col('updated_at')} ELSE {table}.{col('updated_at')} END "
+            f"RETURNING {', '.join(qn(field.column) for field in fields)}, (xmax = 0)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            *row, created = cursor.fetchone()
+
+        user = self.model.from_db(self.db, [field.attname for field in fields], row)
+        if not created:
+            invalidate_principals([user.pk])
+        return user, created
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     ROLE_CHOICES = [
@@ -94,6 +148,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     def is_staff(self):
         return self.is_admin
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Covers soft_delete() / restore() too; see user.authentication
+        invalidate_principals([self.pk])
+
+    def delete(self, *args, **kwargs):
+        invalidate_principals([self.pk])
+        return super().delete(*args, **kwargs)
+
     def soft_delete(self):
         self.is_deleted = True
         self.deleted_at = timezone.now()
@@ -109,7 +172,8 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class UserLoginHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
-    login_time = models.DateTimeField(auto_now_add=True)
+    # Set by user.audit from the request time, rows are written in batches later
+    login_time = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True, null=True)
     success = models.BooleanField(default=True)
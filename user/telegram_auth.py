@@ -1,12 +1,35 @@
 import hashlib
 import hmac
+import random
 from django.conf import settings
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def derive_secret_key(bot_token):
+    """HMAC-SHA256("WebAppData", bot_token): constant per token, so derived once"""
+    return hmac.new(
+        key="WebAppData".encode(),
+        msg=bot_token.encode(),
+        digestmod=hashlib.sha256
+    ).digest()
+
+
+def sampled_debug():
+    """
+    True for a TELEGRAM_AUTH_DEBUG_SAMPLE_RATE share of calls when DEBUG
+    logging is on: per-login detail without flooding logs at login peaks
+    """
+    return (
+        logger.isEnabledFor(logging.DEBUG)
+        and random.random() < settings.TELEGRAM_AUTH_DEBUG_SAMPLE_RATE
+    )
+
+
 def verify_telegram_auth(auth_data):
     """
     Telegram authentication verification WITH phone_number in hash
@@ -22,18 +45,12 @@ def verify_telegram_auth(auth_data):
             logger.warning("No hash provided in auth_data")
             return False
 
-        logger.info(f"Received hash: {received_hash}")
-
-        # Phone_number ham hash'ga kiradi (o'chirmaymiz)
-        logger.info(f"Data with phone_number: {data_to_verify}")
-
         # Verify auth_date (should not be older than 24 hours)
         auth_date = data_to_verify.get('auth_date')
         if auth_date:
             try:
                 auth_time = datetime.fromtimestamp(int(auth_date))
                 time_diff = datetime.now() - auth_time
-                logger.info(f"Auth time: {auth_time}, Time diff: {time_diff}")
 
                 if time_diff > timedelta(hours=24):
                     logger.warning(f"Auth data is too old: {time_diff}")
@@ -43,38 +60,30 @@ def verify_telegram_auth(auth_data):
                 return False
 
         # Filter out empty or None values
+        # Phone_number ham hash'ga kiradi (o'chirmaymiz)
         filtered_data = {k: v for k, v in data_to_verify.items() if v != '' and v is not None}
 
-        logger.info(f"Filtered data for hash: {filtered_data}")
-
         # Create data check string (sorted by key)
         data_check_string = '\n'.join([
             f"{key}={value}"
             for key, value in sorted(filtered_data.items())
         ])
 
-        logger.info(f"Data check string: {data_check_string}")
-
-        # Create secret key
-        secret_key = hmac.new(
-            key="WebAppData".encode(),
-            msg=settings.TELEGRAM_BOT_TOKEN.encode(),
-            digestmod=hashlib.sha256
-        ).digest()
-
         # Calculate hash
         calculated_hash = hmac.new(
-            key=secret_key,
+            key=derive_secret_key(settings.TELEGRAM_BOT_TOKEN),
             msg=data_check_string.encode(),
             digestmod=hashlib.sha256
         ).hexdigest()
 
-        logger.info(f"Calculated hash: {calculated_hash}")
-        logger.info(f"Received hash:   {received_hash}")
-
         # Compare hashes
         is_valid = hmac.compare_digest(calculated_hash, received_hash)
-        logger.info(f"Hash match: {is_valid}")
+
+        if sampled_debug():
+            logger.debug(
+                f"Telegram auth check for {filtered_data.get('id')}: "
+                f"data check string {data_check_string!r}, match: {is_valid}"
+            )
 
         return is_valid
 
@@ -1,3 +1,194 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .audit import LoginEventBuffer
+from .authentication import CachedJWTAuthentication, PrincipalRefreshToken
+from .cache import get_cached_principal
+from .models import User, UserLoginHistory
+
+
+class TelegramUpsertTests(TestCase):
+    def upsert(self, telegram_id=5001, phone_number='+998901234567', **kwargs):
+        options = dict(
+            telegram_id=telegram_id,
+            email=f'telegram_{telegram_id}@telegram.local',
+            name='Ali Valiyev',
+            username='ali',
+            phone_number=phone_number,
+            login_at=timezone.now(),
+        )
+        options.update(kwargs)
+        return User.objects.upsert_telegram_user(**options)
+
+    def test_first_login_inserts_a_client(self):
+        with self.assertNumQueries(1):
+            user, created = self.upsert()
+
+        self.assertTrue(created)
+        self.assertEqual(user, User.objects.get(telegram_id=5001))
+        self.assertEqual((user.role, user.is_active, user.phone_number), ('client', True, '+998901234567'))
+        self.assertIsNotNone(user.last_login_at)
+
+    def test_repeat_login_updates_the_same_row(self):
+        first, _ = self.upsert()
+        later = timezone.now() + timedelta(minutes=5)
+
+        with self.assertNumQueries(1):
+            user, created = self.upsert(login_at=later, name='Changed')
+
+        self.assertFalse(created)
+        self.assertEqual(user.pk, first.pk)
+        self.assertEqual(user.last_login_at, later)
+        # Profile fields are only written on insert; nothing changed, so updated_at stays
+        self.assertEqual(user.name, 'Ali Valiyev')
+        self.assertEqual(user.updated_at, first.updated_at)
+        self.assertEqual(User.objects.filter(telegram_id=5001).count(), 1)
+
+    def test_missing_phone_keeps_the_stored_one(self):
+        self.upsert()
+        user, _ = self.upsert(phone_number='')
+        self.assertEqual(user.phone_number, '+998901234567')
+
+        user, _ = self.upsert(phone_number='+998907654321')
+        self.assertEqual(user.phone_number, '+998907654321')
+
+    def test_login_restores_a_soft_deleted_user(self):
+        first, _ = self.upsert()
+        User.objects.filter(pk=first.pk).update(is_deleted=True, is_active=False, deleted_at=timezone.now())
+
+        user, created = self.upsert()
+
+        self.assertFalse(created)
+        self.assertEqual((user.is_deleted, user.is_active, user.deleted_at), (False, True, None))
+
+
+@override_settings(TELEGRAM_BOT_TOKEN='123456:benchmark-token')
+class TelegramLoginBenchmarkTests(TestCase):
+    def test_benchmark_runs_signed_logins_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_telegram_login', users=3, logins=9, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('logins/sec', output)
+        self.assertIn('created 3, logged in 6, failed 0', output)
+        self.assertFalse(User.objects.filter(telegram_id__gte=9_000_000_000_000).exists())
+
+
+class CachedPrincipalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='client@example.com', name='Client', telegram_id=6001, role='client'
+        )
+        self.backend = CachedJWTAuthentication()
+
+    def authenticate(self, user=None):
+        token = str(PrincipalRefreshToken.for_user(user or self.user).access_token)
+        return self.backend.get_user(self.backend.get_validated_token(token.encode()))
+
+    def save(self, user, method='save'):
+        with self.captureOnCommitCallbacks(execute=True):
+            getattr(user, method)()
+
+    def test_principal_is_read_from_the_cache(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.role), (self.user.pk, 'client'))
+
+    def test_editing_the_user_invalidates_the_principal(self):
+        self.authenticate()
+        self.user.name = 'Renamed'
+        self.save(self.user)
+
+        self.assertIsNone(get_cached_principal(self.user.pk))
+        self.assertEqual(self.authenticate().name, 'Renamed')
+
+    def test_deactivated_user_is_rejected_and_restored_user_accepted(self):
+        token = str(PrincipalRefreshToken.for_user(self.user).access_token).encode()
+        self.authenticate()
+        self.save(self.user, 'soft_delete')
+
+        with self.assertRaises(AuthenticationFailed):
+            self.backend.get_user(self.backend.get_validated_token(token))
+
+        self.save(self.user, 'restore')
+        self.assertTrue(self.backend.get_user(self.backend.get_validated_token(token)).is_active)
+
+    def test_deleted_user_is_rejected(self):
+        token = str(PrincipalRefreshToken.for_user(self.user).access_token).encode()
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed) as raised:
+            self.backend.get_user(self.backend.get_validated_token(token))
+        self.assertEqual(raised.exception.get_codes(), 'user_not_found')
+
+    def test_token_with_outdated_claims_is_rejected(self):
+        token = str(PrincipalRefreshToken.for_user(self.user).access_token).encode()
+        self.user.role = 'seller'
+        self.save(self.user)
+
+        with self.assertRaises(AuthenticationFailed) as raised:
+            self.backend.get_user(self.backend.get_validated_token(token))
+        self.assertEqual(raised.exception.get_codes(), 'token_claims_stale')
+        # A token issued after the change carries the current role
+        self.assertEqual(self.authenticate().role, 'seller')
+
+    @override_settings(AUTH_TRUST_TOKEN_CLAIMS=True)
+    def test_trusted_claims_skip_the_lookup(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.role, user.is_active), (self.user.pk, 'client', True))
+
+
+@mock.patch.object(LoginEventBuffer, 'ensure_worker')
+class LoginEventBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = LoginEventBuffer()
+        self.user = User.objects.create_user(email='client@example.com', name='Client', telegram_id=6001)
+        self.other = User.objects.create_user(email='other@example.com', name='Other', telegram_id=6002)
+        self.now = timezone.now()
+
+    def record(self, user, minutes, success=True, **kwargs):
+        self.buffer.record(user.pk, '127.0.0.1', 'tests', success, self.now + timedelta(minutes=minutes), **kwargs)
+
+    def test_flush_writes_every_event_and_the_latest_login(self, ensure_worker):
+        self.record(self.user, 1)
+        self.record(self.user, 3)
+        self.record(self.user, 2)
+        self.record(self.other, 5, success=False)
+
+        self.assertEqual(self.buffer.flush(), 4)
+
+        self.assertEqual(UserLoginHistory.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(UserLoginHistory.objects.get(user=self.other).success)
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.user.last_login_at, self.now + timedelta(minutes=3))
+        # Failed logins are audited but do not count as a login
+        self.assertIsNone(self.other.last_login_at)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_flush_never_moves_last_login_back(self, ensure_worker):
+        # A login written synchronously after these events were buffered
+        User.objects.filter(pk=self.user.pk).update(last_login_at=self.now + timedelta(minutes=10))
+        self.record(self.user, 1)
+        self.record(self.other, 1, update_last_login=False)
+
+        self.buffer.flush()
+
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.user.last_login_at, self.now + timedelta(minutes=10))
+        self.assertIsNone(self.other.last_login_at)
+        self.assertEqual(UserLoginHistory.objects.count(), 2)
@@ -2,14 +2,15 @@ from django.db import transaction, IntegrityError
 from django.conf import settings
 from rest_framework.generics import GenericAPIView
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .audit import record_login
+from .authentication import PrincipalRefreshToken
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.utils import timezone
 import logging
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -23,7 +24,7 @@ from .serializers import (
     LoginSerializer,
     TelegramLoginSerializer
 )
-from .telegram_auth import verify_telegram_auth, get_client_ip
+from .telegram_auth import sampled_debug, verify_telegram_auth
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +36,6 @@ def telegram_auth_view(request):
     Telegram Web App authentication endpoint with phone number
     User automatically registers or logs in
     """
-    logger.info(f"Received auth request: {request.data}")
-
     serializer = TelegramAuthSerializer(data=request.data)
     if not serializer.is_valid():
         logger.error(f"Invalid data: {serializer.errors}")
@@ -48,8 +47,6 @@ def telegram_auth_view(request):
     # Get validated data - DO NOT MODIFY IT before verification
     auth_data = serializer.validated_data.copy()
 
-    logger.info(f"Validated auth data: {auth_data}")
-
     # 1️⃣ Verify Telegram authentication
     if not verify_telegram_auth(auth_data):
         logger.warning(f"Invalid Telegram auth attempt for ID: {auth_data.get('id')}")
@@ -66,8 +63,6 @@ def telegram_auth_view(request):
     if phone_number and not phone_number.startswith('+'):
         phone_number = f"+{phone_number}"
 
-    logger.info(f"Processing auth for telegram_id: {telegram_id}, phone: {phone_number}")
-
     # 4️⃣ Create unique email for Telegram user
     email = f"telegram_{telegram_id}@telegram.local"
 
@@ -82,49 +77,26 @@ def telegram_auth_view(request):
 
     try:
         with transaction.atomic():
-            # 6️⃣ Get or create user (by telegram_id)
-            user, created = User.objects.get_or_create(
+            # 6️⃣ 7️⃣ 8️⃣ 9️⃣ Create, or update phone / restore / last login, in one statement
+            user, created = User.objects.upsert_telegram_user(
                 telegram_id=telegram_id,
-                defaults={
-                    'email': email,
-                    'name': name,
-                    'username': username,
-                    'phone_number': phone_number if phone_number else None,
-                    'is_active': True,
-                    'role': 'client',
-                }
+                email=email,
+                name=name,
+                username=username,
+                phone_number=phone_number,
+                login_at=timezone.now(),
             )
 
-            # 7️⃣ Update phone number if user exists and phone is new
-            if not created and phone_number:
-                if user.phone_number != phone_number:
-                    user.phone_number = phone_number
-                    user.save(update_fields=['phone_number'])
-                    logger.info(f"Updated phone number for user {telegram_id}")
-
-            # 8️⃣ Restore user if soft-deleted
-            if user.is_deleted:
-                user.restore()
-                logger.info(f"Restored deleted user {telegram_id}")
-
-            # 9️⃣ Update last login time
-            user.last_login_at = timezone.now()
-            user.save(update_fields=['last_login_at'])
-
-            # 🔟 Log login history
-            UserLoginHistory.objects.create(
-                user=user,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                success=True
-            )
+            # 🔟 Log login history (buffered, see user.audit)
+            record_login(user, request, update_last_login=False)
 
             # 1️⃣1️⃣ Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = PrincipalRefreshToken.for_user(user)
 
-            logger.info(
-                f"Telegram user {'created' if created else 'logged in'}: {telegram_id}, phone: {phone_number}"
-            )
+            if created:
+                logger.info(f"Telegram user created: {telegram_id}")
+            elif sampled_debug():
+                logger.debug(f"Telegram user logged in: {telegram_id}")
 
             return Response(
                 {
@@ -177,7 +149,7 @@ def token_verify_view(request):
 def token_refresh_view(request):
     """Token refresh endpoint"""
     try:
-        refresh = RefreshToken.for_user(request.user)
+        refresh = PrincipalRefreshToken.for_user(request.user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh)
@@ -324,31 +296,17 @@ def login_view(request):
         if not user.check_password(password):
             logger.warning(f"Invalid password attempt for user: {email}")
             # Log failed login attempt
-            UserLoginHistory.objects.create(
-                user=user,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                success=False
-            )
+            record_login(user, request, success=False)
             return Response(
                 {'error': 'Invalid email or password'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        # Update last login time
-        user.last_login_at = timezone.now()
-        user.save()
-
-        # Log successful login
-        UserLoginHistory.objects.create(
-            user=user,
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-            success=True
-        )
+        # Log successful login + last login time (buffered, see user.audit)
+        record_login(user, request)
 
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
 
         logger.info(f"User logged in successfully: {email}")
 
@@ -381,7 +339,7 @@ class TelegramTokenObtainView(GenericAPIView):
 
         user = serializer.validated_data["user"]
 
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
 
         return Response(
             {